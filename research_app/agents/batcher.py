@@ -0,0 +1,158 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Sends several prompts in one request; returns one result (or exception) per prompt, in order
+BulkSender = Callable[[List[Any]], List[Any]]
+
+
+class _PendingGroup:
+    """Prompts waiting to be sent to one model, with the time the first one arrived."""
+
+    def __init__(self, send: BulkSender):
+        self.send = send
+        self.started = time.monotonic()
+        self.items: List[Tuple[Any, Future]] = []
+
+
+# --- TDD Anchor: test_summary_batcher ---
+# Test Case: Prompts submitted within the window are sent in one bulk request and demultiplexed in order.
+# Test Case: A full group (max_batch_size prompts) is flushed without waiting for the window.
+# Test Case: Prompts for different models are batched separately.
+# Test Case: A failing prompt fails only its own future; a failed request fails every prompt in it.
+# Test Case: At most max_concurrency bulk requests are in flight.
+# Test Case: Prompts that arrive while every request slot is busy are sent together once one frees up.
+# Test Case: Cancelled futures are not sent.
+# --- End TDD Anchor ---
+class SummaryBatcher:
+    """
+    Collects summarization prompts from concurrent graph runs and sends each group as one
+    bulk request.
+
+    Prompts are grouped per model. A group is ready once `window_seconds` have passed since
+    its first prompt arrived, or as soon as `max_batch_size` prompts are waiting. It is sent
+    when one of the `max_concurrency` request slots is free: up to `max_batch_size` of its
+    prompts go to the group's `send` function (see `SummarizerAgent._invoke_bulk`), which
+    makes a single LLM request for all of them. While every slot is busy, ready groups keep
+    collecting prompts, so a saturated provider gets fewer, larger requests while an idle
+    one gets prompts without delay. Each caller gets a Future resolved with its own result
+    (or exception); a caller that gives up cancels its Future, and the prompt is dropped
+    unless its batch already started.
+    """
+
+    def __init__(self, window_seconds: float = 0.05, max_batch_size: int = 8, max_concurrency: int = 4):
+        self.window_seconds = max(0.0, window_seconds)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.batches_sent = 0
+        self.prompts_sent = 0
+        self._pending: Dict[str, _PendingGroup] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._free_slots = self.max_concurrency # Requests that may still start; guarded by _condition
+        # Batches are sent from a pool so the next window collects while earlier batches run
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="summary-batch")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="summary-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, key: str, send: BulkSender, prompt: Any) -> Future:
+        """
+        Queues `prompt` under `key` (usually the model name) and returns a Future for its result.
+        The group is sent with the `send` function of its first prompt.
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("SummaryBatcher is closed")
+            group = self._pending.get(key)
+            if group is None:
+                group = self._pending[key] = _PendingGroup(send)
+            group.items.append((prompt, future))
+            self._condition.notify()
+        return future
+
+    def close(self) -> None:
+        """Flushes every pending prompt, then stops the dispatcher and waits for running batches."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "SummaryBatcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._condition:
+                ready = self._take_ready()
+                while not ready:
+                    if self._closed and not self._pending:
+                        return
+                    # Without a free slot, wait for a running batch to finish
+                    self._condition.wait(self._next_flush_in() if self._free_slots else None)
+                    ready = self._take_ready()
+            for send, items in ready:
+                self._executor.submit(self._run_batch, send, items)
+
+    def _take_ready(self) -> List[Tuple[BulkSender, List[Tuple[Any, Future]]]]:
+        """
+        Takes one batch per free request slot from the groups that are full, whose window
+        expired, or all of them once closed (oldest group first). A group with more prompts
+        than free slots is split evenly over them.
+        """
+        now = time.monotonic()
+        ready = []
+        for key, group in sorted(self._pending.items(), key=lambda item: item[1].started):
+            if not (self._closed or len(group.items) >= self.max_batch_size or now - group.started >= self.window_seconds):
+                continue
+            while group.items and self._free_slots:
+                # Spread the prompts over the free slots; bundle only what does not fit
+                size = min(self.max_batch_size, -(-len(group.items) // self._free_slots))
+                ready.append((group.send, group.items[:size]))
+                del group.items[:size]
+                self._free_slots -= 1
+            if not group.items:
+                del self._pending[key]
+        return ready
+
+    def _next_flush_in(self) -> Optional[float]:
+        """Seconds until the oldest group's window expires (None: wait for the next prompt)."""
+        if not self._pending:
+            return None
+        oldest = min(group.started for group in self._pending.values())
+        return max(0.0, oldest + self.window_seconds - time.monotonic())
+
+    def _run_batch(self, send: BulkSender, items: List[Tuple[Any, Future]]) -> None:
+        try:
+            outcomes = self._send_batch(send, items)
+        finally:
+            # Free the slot before waking the callers, so their next prompts find it free
+            with self._condition:
+                self._free_slots += 1
+                self._condition.notify()
+        for future, result in outcomes:
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _send_batch(self, send: BulkSender, items: List[Tuple[Any, Future]]) -> List[Tuple[Future, Any]]:
+        """Sends the prompts not cancelled yet; returns each future with its result or exception."""
+        items = [(prompt, future) for prompt, future in items if future.set_running_or_notify_cancel()]
+        if not items:
+            return []
+        with self._condition: # Batches run in parallel pool threads
+            self.batches_sent += 1
+            self.prompts_sent += len(items)
+        try:
+            results = send([prompt for prompt, _ in items])
+            if len(results) != len(items):
+                raise ValueError(f"Bulk request returned {len(results)} results for {len(items)} prompts")
+        except Exception as e:
+            results = [e] * len(items)
+        return [(future, result) for (_, future), result in zip(items, results)]
@@ -1,11 +1,25 @@
+import hashlib
 import os
 import requests # Added for making HTTP requests
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Tuple
 # Removed PydanticAI import as it's not used here
 # Removed TavilyClient import
 
 from .schemas import ResearchResult
 from ..config import app_settings, AppSettings # Import app_settings instance and the class for type hinting
+from ..deadline import DeadlineExceeded, capped_timeout, check
+from ..thread_hooks import carry_context
+
+SEARCH_TIMEOUT_SECONDS = 10 # Per-request cap; shortened further by the query deadline
+RESULTS_PER_PAGE = 5
+MAX_PAGES = 10 # Brave accepts page offsets 0-9
+
+
+def snippet_fingerprint(snippet: str) -> str:
+    """Fingerprint of a snippet's normalized text (collapsed whitespace, case-folded)."""
+    normalized = " ".join(snippet.split()).casefold()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
 
 # --- TDD Anchor: test_researcher_initialization ---
 # Test Case: Ensure researcher agent initializes correctly with settings.
@@ -16,6 +30,7 @@ class ResearcherAgent:
     """Agent responsible for performing web searches using the Brave Search API."""
     # No specific search tool client needed, will use requests directly
     brave_api_key: str # Store the API key
+    pages: int # Number of result pages fetched per query
 
     def __init__(self, settings: AppSettings):
         """Initializes the Researcher Agent with necessary configurations."""
@@ -26,19 +41,103 @@ class ResearcherAgent:
 
         # Store the Brave API key from settings
         self.brave_api_key = settings.brave_api_key
+        self.pages = max(1, min(MAX_PAGES, settings.research_pages))
         print("Researcher Agent Initialized.")
 
     # --- TDD Anchor: test_researcher_run ---
     # Test Case: Input a query, mock search results, verify output structure (ResearchResult).
     # Test Case: Handle empty search results.
     # Test Case: Handle search tool API errors.
+    # Test Case: Raise DeadlineExceeded when the deadline expires before or during the request.
+    # Test Case: With several result pages, combine the snippets of all successful pages.
     # --- End TDD Anchor ---
-    def run(self, query: str) -> ResearchResult:
-        """Performs web search based on the query using the Brave Search API."""
+    def run(self, query: str, deadline: Optional[float] = None) -> ResearchResult:
+        """
+        Performs web search based on the query using the Brave Search API.
+
+        Raises DeadlineExceeded if `deadline` (epoch seconds) passes before the search completes.
+        """
+        check(deadline, "research")
         print(f"Researcher Agent: Starting research for query: '{query}' using Brave Search")
         results_list: List[str] = []
-        combined_content = ""
+        errors: List[str] = []
+
+        for snippets, error_msg in self.iter_result_batches(query, deadline=deadline):
+            results_list.extend(snippets)
+            if error_msg:
+                errors.append(error_msg)
+
+        return self.combine(query, results_list, errors)
+
+    # --- TDD Anchor: test_researcher_new_snippets ---
+    # Test Case: Snippets already seen (modulo whitespace/case) are not new.
+    # Test Case: Duplicates within the current result are reported once.
+    # --- End TDD Anchor ---
+    @staticmethod
+    def new_snippets(seen_fingerprints: Iterable[str], current: ResearchResult) -> List[str]:
+        """Snippets of `current` whose fingerprint is not in `seen_fingerprints`, in result order."""
+        seen = set(seen_fingerprints)
+        fresh = []
+        for snippet in current.search_results:
+            fingerprint = snippet_fingerprint(snippet)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                fresh.append(snippet)
+        return fresh
+
+    @staticmethod
+    def combine(query: str, results_list: List[str], errors: List[str]) -> ResearchResult:
+        """Builds the ResearchResult for the snippets (and page errors) collected for a query."""
+        if results_list:
+            combined_content = "\n\n---\n\n".join(results_list)
+            print(f"Researcher Agent: Found {len(results_list)} results via Brave Search.")
+        elif errors:
+            # Keep the first error as the raw content so downstream nodes detect the failure
+            combined_content = errors[0]
+        else:
+            print("Researcher Agent: No results found by Brave Search.")
+            combined_content = f"No search results found for '{query}' via Brave Search."
+
+        research_data = ResearchResult(
+            query=query,
+            search_results=results_list, # Store the extracted content snippets
+            raw_content=combined_content
+        )
+        return research_data
+
+    # --- TDD Anchor: test_researcher_iter_result_batches ---
+    # Test Case: Yields one (snippets, error) batch per result page, in completion order.
+    # Test Case: A failing page yields its error without stopping the other pages.
+    # --- End TDD Anchor ---
+    def iter_result_batches(self, query: str, deadline: Optional[float] = None,
+                            idle_timeout: Optional[float] = None) -> Iterator[Optional[Tuple[List[str], Optional[str]]]]:
+        """
+        Fetches `self.pages` result pages concurrently and yields (snippets, error_msg) per page as it lands.
+
+        Used by `run` and by the pipelined graph, which starts summarizing early batches when
+        later pages lag behind. If `idle_timeout` is set, None is yielded whenever that many
+        seconds pass without a page landing. Raises DeadlineExceeded if the deadline passes.
+        """
+        if self.pages <= 1:
+            yield self._search_page(query, 0, deadline)
+            return
 
+        executor = ThreadPoolExecutor(max_workers=self.pages, thread_name_prefix="brave-search")
+        try:
+            search_page = carry_context(self._search_page)
+            pending = {executor.submit(search_page, query, offset, deadline) for offset in range(self.pages)}
+            while pending:
+                done, pending = wait(pending, timeout=idle_timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    yield None # Still waiting for the remaining pages
+                for future in done:
+                    yield future.result()
+        finally:
+            # Do not wait for (or start) remaining pages if the caller stops early or the deadline hit
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _search_page(self, query: str, offset: int, deadline: Optional[float]) -> Tuple[List[str], Optional[str]]:
+        """Fetches one Brave result page. Returns (snippets, error_msg); only DeadlineExceeded is raised."""
         search_url = "https://api.search.brave.com/res/v1/web/search"
         headers = {
             "Accept": "application/json",
@@ -47,41 +146,36 @@ class ResearcherAgent:
         }
         params = {
             "q": query,
-            "count": 5 # Number of results to fetch
+            "count": RESULTS_PER_PAGE, # Number of results to fetch
+            "offset": offset # Zero-based page index
         }
 
         try:
-            response = requests.get(search_url, headers=headers, params=params, timeout=10)
+            check(deadline, "Brave search")
+            response = requests.get(
+                search_url, headers=headers, params=params,
+                timeout=max(0.01, capped_timeout(deadline, SEARCH_TIMEOUT_SECONDS))
+            )
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
             data = response.json()
             search_results = data.get('web', {}).get('results', [])
+            # Extract description/snippet from Brave results
+            # Adjust the key if Brave uses a different field name (e.g., 'snippet')
+            return [str(result.get('description', '')) for result in search_results if result.get('description')], None
 
-            if search_results:
-                # Extract description/snippet from Brave results
-                # Adjust the key if Brave uses a different field name (e.g., 'snippet')
-                results_list = [str(result.get('description', '')) for result in search_results if result.get('description')]
-                combined_content = "\n\n---\n\n".join(results_list)
-                print(f"Researcher Agent: Found {len(results_list)} results via Brave Search.")
-            else:
-                print("Researcher Agent: No results found by Brave Search.")
-                combined_content = f"No search results found for '{query}' via Brave Search."
-
+        except requests.exceptions.Timeout as e:
+            if deadline is not None and capped_timeout(deadline, SEARCH_TIMEOUT_SECONDS) <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded during Brave search: {e}") from e
+            error_msg = f"Error during Brave Search API request: {e}"
         except requests.exceptions.RequestException as e:
             error_msg = f"Error during Brave Search API request: {e}"
-            print(f"ERROR: Researcher Agent failed for '{query}': {error_msg}")
-            combined_content = error_msg
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             error_msg = f"An unexpected error occurred during Brave search: {e}"
-            print(f"ERROR: Researcher Agent failed for '{query}': {error_msg}")
-            combined_content = error_msg
-
-        research_data = ResearchResult(
-            query=query,
-            search_results=results_list, # Store the extracted content snippets
-            raw_content=combined_content
-        )
-        return research_data
+        print(f"ERROR: Researcher Agent failed for '{query}' (page {offset}): {error_msg}")
+        return [], error_msg
 
 # Note: Agent instantiation is removed from here.
 # It will be handled by the graph builder or main application logic
@@ -0,0 +1,117 @@
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .schemas import ResearchResult, RoutingDecision
+from ..config import AppSettings # For type hinting
+
+FAST_TIER = "fast"
+LARGE_TIER = "large"
+
+# --- TDD Anchor: test_router_choose ---
+# Test Case: Short content with few snippets is routed to the fast model.
+# Test Case: Long content, many snippets or a long query is routed to the large model.
+# Test Case: Identical fast and large model names always route to the large model.
+# Test Case: Budget-limited requests go to the fast model regardless of size.
+# Test Case: Recorded decisions are summarized per tier (count, p50, p95 latency).
+# --- End TDD Anchor ---
+class ModelRouter:
+    """
+    Chooses between the fast and the large LLM for a summarization request.
+
+    Small or simple inputs go to the fast model; long or complex inputs go to the
+    large model. Every decision is recorded (bounded) together with its latency so
+    the thresholds can be tuned against the latency SLO.
+    """
+
+    def __init__(self, settings: AppSettings, history_size: int = 1000):
+        """Initializes the router with model names and thresholds from settings."""
+        self.fast_model_name = settings.google_llm_fast_model_name
+        self.large_model_name = settings.google_llm_model_name
+        self.max_fast_chars = settings.routing_fast_max_chars
+        self.max_fast_snippets = settings.routing_fast_max_snippets
+        self.max_fast_query_words = settings.routing_fast_max_query_words
+        # Bounded so long-running workers do not grow without limit
+        self.decisions: Deque[RoutingDecision] = deque(maxlen=history_size)
+        self._lock = threading.Lock() # Batch and pipeline threads record decisions concurrently
+
+    def choose(self, research_data: ResearchResult, budget_limited: Optional[str] = None) -> RoutingDecision:
+        """
+        Returns the routing decision (tier, model and reason) for the given research data.
+
+        `budget_limited` (the reason the token budget forced truncation) routes to the fast model.
+        """
+        query = research_data.query
+        if not self.fast_model_name or self.fast_model_name == self.large_model_name:
+            return self._decision(query, LARGE_TIER, "no distinct fast model configured")
+        if budget_limited:
+            return self._decision(query, FAST_TIER, budget_limited)
+
+        content_chars = len(research_data.raw_content or "")
+        snippet_count = len(research_data.search_results)
+        query_words = len(query.split())
+
+        if content_chars > self.max_fast_chars:
+            return self._decision(query, LARGE_TIER, f"content length {content_chars} > {self.max_fast_chars} chars")
+        if snippet_count > self.max_fast_snippets:
+            return self._decision(query, LARGE_TIER, f"{snippet_count} snippets > {self.max_fast_snippets}")
+        if query_words > self.max_fast_query_words:
+            return self._decision(query, LARGE_TIER, f"query length {query_words} > {self.max_fast_query_words} words")
+        return self._decision(query, FAST_TIER, "small input")
+
+    def escalate(self, decision: RoutingDecision, reason: str) -> RoutingDecision:
+        """Returns a copy of a fast-tier decision escalated to the large model."""
+        return decision.model_copy(update={
+            "tier": LARGE_TIER,
+            "model_name": self.large_model_name,
+            "reason": f"escalated: {reason}",
+            "escalated": True,
+        })
+
+    def record(self, decision: RoutingDecision) -> None:
+        """Stores a final decision (with latency) and logs it."""
+        with self._lock:
+            self.decisions.append(decision)
+        print(
+            f"Model Router: query='{decision.query}' tier={decision.tier} model={decision.model_name} "
+            f"escalated={decision.escalated} latency={decision.latency_seconds:.2f}s ({decision.reason})"
+        )
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns count, escalation count and p50/p95 latency per tier over recorded decisions."""
+        with self._lock:
+            decisions = list(self.decisions)
+        by_tier: Dict[str, List[RoutingDecision]] = {}
+        for decision in decisions:
+            by_tier.setdefault(decision.tier, []).append(decision)
+
+        summary: Dict[str, Dict[str, float]] = {}
+        for tier, decisions in by_tier.items():
+            latencies = sorted(d.latency_seconds for d in decisions)
+            summary[tier] = {
+                "count": len(decisions),
+                "escalated": sum(1 for d in decisions if d.escalated),
+                "p50_seconds": _percentile(latencies, 0.50),
+                "p95_seconds": _percentile(latencies, 0.95),
+            }
+        return summary
+
+    def _decision(self, query: str, tier: str, reason: str) -> RoutingDecision:
+        model_name = self.fast_model_name if tier == FAST_TIER else self.large_model_name
+        return RoutingDecision(query=query, tier=tier, model_name=model_name, reason=reason)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def format_latency_summary(summary: Dict[str, Dict[str, float]]) -> List[str]:
+    """One line per model tier from `ModelRouter.latency_summary`, for tuning the routing thresholds."""
+    return [f"{tier}: {int(stats['count'])} LLM call(s), {int(stats['escalated'])} escalated, "
+            f"p50 {stats['p50_seconds']:.2f}s, p95 {stats['p95_seconds']:.2f}s"
+            for tier, stats in sorted(summary.items())]
@@ -19,4 +19,46 @@ class ResearchResult(BaseModel):
 class SummaryResult(BaseModel):
     """Schema for the output of the Summarizer Agent."""
     summary: str = Field(description="The final generated summary")
-    original_query: str = Field(description="The query that led to this summary")
\ No newline at end of file
+    original_query: str = Field(description="The query that led to this summary")
+
+
+class BulkSummaryResult(BaseModel):
+    """Schema for one LLM request answering several summarization tasks (batch mode)."""
+    summaries: List[SummaryResult] = Field(description="One SummaryResult per task, in task order")
+
+
+# --- TDD Anchor: test_routing_decision_schema ---
+# Test Case: Validate creation of RoutingDecision for both tiers.
+# --- End TDD Anchor ---
+class RoutingDecision(BaseModel):
+    """Schema describing which model the Summarizer Agent used for a query, and why."""
+    query: str = Field(description="The query the decision was made for")
+    tier: str = Field(description="Model tier that produced the summary: 'fast' or 'large'")
+    model_name: str = Field(description="Name of the model that produced the summary")
+    reason: str = Field(description="Why this tier was chosen")
+    escalated: bool = Field(default=False, description="True if the fast model failed and the large model was used instead")
+    latency_seconds: float = Field(default=0.0, description="Wall-clock time of the LLM call this decision routed, including an escalation retry (in pipelined runs: the final reduce call)")
+
+
+# --- TDD Anchor: test_token_usage_schema ---
+# Test Case: Usage of several LLM calls adds up; estimated counts stay flagged as estimated.
+# --- End TDD Anchor ---
+class TokenUsage(BaseModel):
+    """Schema for the LLM tokens spent on a query (or a whole batch)."""
+    input_tokens: int = Field(default=0, description="Prompt tokens sent to the LLM")
+    output_tokens: int = Field(default=0, description="Tokens generated by the LLM")
+    calls: int = Field(default=0, description="Number of LLM calls the tokens were spent on")
+    estimated: bool = Field(default=False, description="True if any count was estimated because the response carried no usage metadata")
+    truncated: bool = Field(default=False, description="True if research content was truncated to fit the token budget")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, other: "TokenUsage") -> None:
+        """Adds another usage to this one in place."""
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.calls += other.calls
+        self.estimated = self.estimated or other.estimated
+        self.truncated = self.truncated or other.truncated
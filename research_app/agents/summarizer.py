@@ -1,10 +1,36 @@
 import os
+import threading
+import time
+from concurrent.futures import wait
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple
 # Import Google Generative AI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.language_models.chat_models import BaseChatModel # For type hinting
 
-from .schemas import SummaryResult, ResearchResult
+from .schemas import BulkSummaryResult, SummaryResult, ResearchResult, RoutingDecision, TokenUsage
+from .router import ModelRouter, FAST_TIER
+from .batcher import SummaryBatcher
+from .tokens import (BatchBudgetExceeded, TokenBudget, TokenBudgetExceeded, SUMMARY_OUTPUT_TOKENS_ESTIMATE,
+                     estimate_tokens, split_usage, usage_from_response)
 from ..config import app_settings, AppSettings # Import app_settings instance and the class for type hinting
+from ..deadline import CallAbandoned, DeadlineExceeded, call_with_deadline, check, remaining
+
+# Separator between snippets in research content (matches ResearcherAgent.combine)
+SNIPPET_SEPARATOR = "\n\n---\n\n"
+
+def _request_limits(settings: AppSettings) -> dict:
+    """
+    Client-side timeout and retries for the Gemini clients.
+
+    A call whose deadline expires is abandoned by `call_with_deadline`, but the request itself
+    keeps running in its thread. The per-attempt timeout splits QUERY_TIMEOUT_SECONDS over all
+    attempts, so an abandoned request (retries included) ends within one query budget.
+    """
+    limits = {"max_retries": settings.llm_max_retries}
+    if settings.query_timeout_seconds and settings.query_timeout_seconds > 0:
+        limits["timeout"] = settings.query_timeout_seconds / (settings.llm_max_retries + 1)
+    return limits
 
 # --- TDD Anchor: test_summarizer_initialization ---
 # Test Case: Ensure summarizer agent initializes correctly with settings.
@@ -14,6 +40,10 @@ from ..config import app_settings, AppSettings # Import app_settings instance an
 class SummarizerAgent:
     """Agent responsible for summarizing researched content using PydanticAI."""
     llm: BaseChatModel # Use BaseChatModel for type hinting the LangChain LLM
+    fast_llm: BaseChatModel # Fast, cheap model used for small inputs
+    router: ModelRouter
+    batch_budget: TokenBudget # Token budget shared by the queries of one batch (replaced or reset per batch)
+    batcher: Optional[SummaryBatcher] # Set in batch mode: prompts of concurrent queries share one LLM request
 
     def __init__(self, settings: AppSettings):
         """Initializes the Summarizer Agent with necessary configurations."""
@@ -27,10 +57,30 @@ class SummarizerAgent:
             model=settings.google_llm_model_name, # Use Google model name from settings
             google_api_key=settings.google_api_key, # Use Google API key from settings
             temperature=0.3, # Keep temperature setting
-            convert_system_message_to_human=True # Gemini often requires this
+            convert_system_message_to_human=True, # Gemini often requires this
+            **_request_limits(settings)
         )
         # Store the initialized LangChain LLM directly
         self.llm = google_llm
+
+        # Fast model for small inputs; reuse the large model if no distinct fast model is configured
+        self.router = ModelRouter(settings)
+        if self.router.fast_model_name and self.router.fast_model_name != settings.google_llm_model_name:
+            self.fast_llm = ChatGoogleGenerativeAI(
+                model=self.router.fast_model_name,
+                google_api_key=settings.google_api_key,
+                temperature=0.3,
+                convert_system_message_to_human=True,
+                **_request_limits(settings)
+            )
+        else:
+            self.fast_llm = google_llm
+        # Routing decisions are per thread: pipelined and batched runs call the agent concurrently
+        self._local = threading.local()
+        self.max_tokens_per_query = settings.max_tokens_per_query
+        self.batch_budget = TokenBudget(settings.max_tokens_per_batch)
+        self._usage_lock = threading.Lock() # Map calls of one query add to its usage concurrently
+        self.batcher = None
         print("Summarizer Agent Initialized.")
 
     # --- TDD Anchor: test_summarizer_run ---
@@ -38,11 +88,22 @@ class SummarizerAgent:
     # Test Case: Handle empty input content (ResearchResult.raw_content is empty).
     # Test Case: Handle LLM API errors.
     # Test Case: Ensure summary is based on input content.
+    # Test Case: Raise DeadlineExceeded (without escalating) when the deadline expires during the LLM call.
+    # Test Case: Token usage is added to `usage`; content is truncated or the call skipped to respect budgets.
+    # Test Case: A call abandoned at the deadline is charged at least its prompt estimate.
     # --- End TDD Anchor ---
-    def run(self, research_data: ResearchResult) -> SummaryResult:
-        """Generates a summary from the researched content using PydanticAI."""
+    def run(self, research_data: ResearchResult, deadline: Optional[float] = None,
+            usage: Optional[TokenUsage] = None, query_budget: Optional[TokenBudget] = None) -> SummaryResult:
+        """
+        Generates a summary from the researched content using PydanticAI.
+
+        Tokens spent are added to `usage` and charged to `query_budget` (see `new_query_budget`).
+        Raises DeadlineExceeded if `deadline` (epoch seconds) passes before the LLM answers, and
+        TokenBudgetExceeded if no call fits the token budget.
+        """
         print(f"Summarizer Agent: Starting summarization for query: '{research_data.query}'")
         original_query = research_data.query if research_data else "Unknown"
+        self.last_routing_decision = None
 
         if not research_data or not research_data.raw_content or "Error during" in research_data.raw_content:
             warning_msg = "No valid content found to summarize."
@@ -53,8 +114,212 @@ class SummarizerAgent:
             # Return a valid SummaryResult indicating the issue
             return SummaryResult(summary=warning_msg, original_query=original_query)
 
+        try:
+            summary_result = self._generate(research_data, self._summary_prompt, deadline, usage, query_budget)
+            print("Summarizer Agent: LLM summarization successful.")
+            # Ensure the original query is preserved if the LLM doesn't include it
+            # (This might be less necessary now as structured output often handles it)
+            if not summary_result.original_query:
+                 summary_result.original_query = original_query
+            return summary_result
+
+        except (DeadlineExceeded, TokenBudgetExceeded) as e:
+            # Let the graph node fall back to a partial result
+            print(f"Summarizer Agent: No summary for query '{original_query}': {e}")
+            raise
+        except Exception as e:
+            error_msg = f"Error generating summary via LLM: {e}" # Updated error message source
+            print(f"ERROR: Summarizer Agent failed for query '{original_query}': {error_msg}")
+            # Return a valid SummaryResult indicating the error
+            return SummaryResult(summary=error_msg, original_query=original_query)
+
+    # --- TDD Anchor: test_summarizer_map_reduce ---
+    # Test Case: summarize_batch returns the partial summary text for one snippet batch.
+    # Test Case: reduce combines partial summaries into one SummaryResult.
+    # Test Case: LLM errors propagate so the pipeline can decide how to degrade.
+    # --- End TDD Anchor ---
+    def summarize_batch(self, query: str, snippets: List[str], deadline: Optional[float] = None,
+                        usage: Optional[TokenUsage] = None, query_budget: Optional[TokenBudget] = None) -> str:
+        """Map step of pipelined summarization: summarizes one batch of snippets. Raises on failure."""
+        batch = ResearchResult(query=query, search_results=snippets, raw_content=SNIPPET_SEPARATOR.join(snippets))
+        return self._generate(batch, self._batch_prompt, deadline, usage, query_budget).summary
+
+    def reduce(self, query: str, partial_summaries: List[str], deadline: Optional[float] = None,
+               snippets: Optional[List[str]] = None, usage: Optional[TokenUsage] = None,
+               query_budget: Optional[TokenBudget] = None) -> SummaryResult:
+        """
+        Reduce step of pipelined summarization: merges partial summaries, plus any snippets not
+        yet summarized, into the final summary. Raises on failure.
+        """
+        items = partial_summaries + (snippets or [])
+        merged = ResearchResult(query=query, search_results=items, raw_content=SNIPPET_SEPARATOR.join(items))
+        # Budget truncation drops items from the end, so raw snippets go before partial summaries
+        build_prompt = lambda data: self._reduce_prompt(
+            query, data.search_results[:len(partial_summaries)], data.search_results[len(partial_summaries):])
+        summary_result = self._generate(merged, build_prompt, deadline, usage, query_budget)
+        if not summary_result.original_query:
+            summary_result.original_query = query
+        return summary_result
+
+    # --- TDD Anchor: test_summarizer_refresh ---
+    # Test Case: The delta prompt contains the previous summary and only the new snippets.
+    # Test Case: LLM errors propagate so the graph node can report them.
+    # --- End TDD Anchor ---
+    def refresh(self, previous_summary: SummaryResult, new_material: ResearchResult,
+                deadline: Optional[float] = None, usage: Optional[TokenUsage] = None,
+                query_budget: Optional[TokenBudget] = None) -> SummaryResult:
+        """
+        Delta summarization for refresh runs: updates `previous_summary` with the snippets in
+        `new_material` (only those not seen when it was written). Raises on failure.
+        """
+        query = new_material.query
+        build_prompt = lambda data: self._refresh_prompt(query, previous_summary.summary, data.raw_content)
+        summary_result = self._generate(new_material, build_prompt, deadline, usage, query_budget)
+        if not summary_result.original_query:
+            summary_result.original_query = query
+        return summary_result
+
+    def new_query_budget(self, usage: Optional[TokenUsage] = None) -> TokenBudget:
+        """
+        MAX_TOKENS_PER_QUERY budget for one query, with the tokens already in `usage` counted as used.
+
+        Pass the same budget to every call of a query whose calls overlap (pipelined map and reduce
+        calls), so they reserve from it like concurrent queries reserve from the batch budget.
+        """
+        budget = TokenBudget(self.max_tokens_per_query)
+        if usage is not None:
+            budget.commit(0, usage.total_tokens)
+        return budget
+
+    @property
+    def last_routing_decision(self) -> Optional[RoutingDecision]:
+        """Routing decision of the most recent LLM call made by the current thread."""
+        return getattr(self._local, "last_routing_decision", None)
+
+    @last_routing_decision.setter
+    def last_routing_decision(self, decision: Optional[RoutingDecision]) -> None:
+        self._local.last_routing_decision = decision
+
+    def _generate(self, research_data: ResearchResult, build_prompt: Callable[[ResearchResult], str],
+                  deadline: Optional[float], usage: Optional[TokenUsage] = None,
+                  query_budget: Optional[TokenBudget] = None) -> SummaryResult:
+        """
+        Fits the prompt to the token budgets, routes it to the fast or large model (escalating
+        on failure), records the decision and adds the tokens spent to `usage`, the query
+        budget and the batch budget.
+        """
+        # Cleared first: a call refused by the budgets must not report this thread's previous decision
+        self.last_routing_decision = None
+        if query_budget is None:
+            query_budget = self.new_query_budget(usage)
+        research_data, prompt, budget_note = self._fit_budget(research_data, build_prompt, query_budget)
+        needed = estimate_tokens(prompt) + SUMMARY_OUTPUT_TOKENS_ESTIMATE
+        # Concurrent calls may have used the room _fit_budget saw
+        self._reserve(query_budget, needed, "Token budget exhausted")
+        reserved, committed = needed, 0
+        spent = TokenUsage(truncated=budget_note is not None)
+
+        decision = self.router.choose(research_data, budget_limited=budget_note)
+        started = time.perf_counter()
+        try:
+            if decision.tier == FAST_TIER:
+                try:
+                    return self._call_model(self.fast_llm, research_data.query, prompt, decision.model_name,
+                                            deadline, spent)
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    # The failed call still consumed the prompt
+                    spent.add(TokenUsage(input_tokens=estimate_tokens(prompt), calls=1, estimated=True))
+                    if budget_note:
+                        raise # No budget left for a second call on the large model
+                    # The escalated call must fit the budgets as well, after what the failed call used
+                    query_budget.commit(reserved, spent.total_tokens)
+                    self.batch_budget.commit(reserved, spent.total_tokens)
+                    reserved, committed = 0, spent.total_tokens
+                    self._reserve(query_budget, needed, f"Fast model failed ({e}) and the token budget has no room to escalate")
+                    reserved = needed
+                    # Fast model failed or returned invalid output: escalate to the large model
+                    print(f"Summarizer Agent: Fast model failed ({e}), escalating to large model.")
+                    decision = self.router.escalate(decision, str(e))
+            return self._call_model(self.llm, research_data.query, prompt, decision.model_name, deadline, spent)
+        finally:
+            query_budget.commit(reserved, spent.total_tokens - committed)
+            self.batch_budget.commit(reserved, spent.total_tokens - committed)
+            if usage is not None:
+                with self._usage_lock:
+                    usage.add(spent)
+            decision.latency_seconds = time.perf_counter() - started
+            self.last_routing_decision = decision
+            self.router.record(decision)
+
+    def _fit_budget(self, research_data: ResearchResult, build_prompt: Callable[[ResearchResult], str],
+                    query_budget: TokenBudget) -> Tuple[ResearchResult, str, Optional[str]]:
+        """
+        Returns the research data and prompt that fit the per-query and batch token budgets,
+        dropping trailing snippets if needed, plus a note describing the truncation (None if
+        nothing was dropped). Raises TokenBudgetExceeded if not even one snippet fits, or
+        BatchBudgetExceeded if the batch budget is the one that ran out.
+        """
+        prompt = build_prompt(research_data)
+        allowance = self._token_allowance(query_budget)
+        if allowance is None or estimate_tokens(prompt) + SUMMARY_OUTPUT_TOKENS_ESTIMATE <= allowance:
+            return research_data, prompt, None
+
+        snippets = list(research_data.search_results)
+        total = len(snippets)
+        while len(snippets) > 1:
+            snippets.pop()
+            truncated = ResearchResult(query=research_data.query, search_results=snippets,
+                                       raw_content=SNIPPET_SEPARATOR.join(snippets))
+            prompt = build_prompt(truncated)
+            if estimate_tokens(prompt) + SUMMARY_OUTPUT_TOKENS_ESTIMATE <= allowance:
+                note = f"token budget: kept {len(snippets)}/{total} snippets ({allowance} tokens left)"
+                print(f"Summarizer Agent: {note}")
+                return truncated, prompt, note
+        batch_remaining = self.batch_budget.remaining()
+        error_type = BatchBudgetExceeded if batch_remaining is not None and batch_remaining <= allowance else TokenBudgetExceeded
+        raise error_type(f"Token budget exhausted ({allowance} tokens left) for query '{research_data.query}'")
+
+    def _reserve(self, query_budget: TokenBudget, tokens: int, reason: str) -> None:
+        """
+        Reserves `tokens` in the query and batch budgets, or in neither. Raises TokenBudgetExceeded
+        (BatchBudgetExceeded if the batch budget is the one without room) prefixed with `reason`.
+        """
+        if not query_budget.reserve(tokens):
+            raise TokenBudgetExceeded(f"{reason} (query budget of {query_budget.limit} tokens)")
+        if not self.batch_budget.reserve(tokens):
+            query_budget.commit(tokens, 0)
+            raise BatchBudgetExceeded(f"{reason} (batch budget of {self.batch_budget.limit} tokens)")
+
+    def _call_model(self, llm: BaseChatModel, query: str, prompt: str, model_name: str,
+                    deadline: Optional[float], spent: TokenUsage) -> SummaryResult:
+        """Runs one structured LLM call for `query` and adds its token usage to `spent`."""
+        check(deadline, f"LLM call to '{model_name}'") # Raised here, nothing was sent
+        try:
+            summary_result, call_usage = self._invoke_structured(llm, query, prompt, model_name, deadline)
+        except CallAbandoned:
+            # The request keeps running and spending tokens: charge at least its prompt
+            spent.add(TokenUsage(input_tokens=estimate_tokens(prompt), calls=1, estimated=True))
+            raise
+        spent.add(call_usage)
+        return summary_result
+
+    def _token_allowance(self, query_budget: TokenBudget) -> Optional[int]:
+        """Tokens the next call may spend under the per-query and batch budgets (None if unlimited)."""
+        allowances = []
+        query_remaining = query_budget.remaining()
+        if query_remaining is not None:
+            allowances.append(query_remaining)
+        batch_remaining = self.batch_budget.remaining()
+        if batch_remaining is not None:
+            allowances.append(batch_remaining)
+        return min(allowances) if allowances else None
+
+    @staticmethod
+    def _summary_prompt(research_data: ResearchResult) -> str:
         # Construct the prompt for PydanticAI, instructing it to generate a SummaryResult
-        prompt = f"""
+        return f"""
         Based on the following research content about '{research_data.query}', please generate a concise summary.
         Ensure the output strictly follows the required JSON format for SummaryResult.
 
@@ -65,24 +330,154 @@ class SummarizerAgent:
         Generate the SummaryResult object now.
         """
 
-        try:
-            # Use LangChain's structured output method
-            print("Summarizer Agent: Calling LLM with structured output...")
-            structured_llm = self.llm.with_structured_output(SummaryResult)
-            summary_result: SummaryResult = structured_llm.invoke(prompt)
+    @staticmethod
+    def _batch_prompt(batch: ResearchResult) -> str:
+        return f"""
+        Summarize the key facts in the following search snippets about '{batch.query}'.
+        These are only some of the results; another step will combine several such partial summaries.
+        Ensure the output strictly follows the required JSON format for SummaryResult.
 
-            print("Summarizer Agent: LLM summarization successful.")
-            # Ensure the original query is preserved if the LLM doesn't include it
-            # (This might be less necessary now as structured output often handles it)
-            if not summary_result.original_query:
-                 summary_result.original_query = original_query
-            return summary_result
+        --- SEARCH SNIPPETS START ---
+        {batch.raw_content}
+        --- SEARCH SNIPPETS END ---
+        """
+
+    @staticmethod
+    def _reduce_prompt(query: str, partial_summaries: List[str], snippets: List[str]) -> str:
+        sections = []
+        if partial_summaries:
+            sections.append("--- PARTIAL SUMMARIES START ---\n" + SNIPPET_SEPARATOR.join(partial_summaries)
+                            + "\n--- PARTIAL SUMMARIES END ---")
+        if snippets:
+            sections.append("--- SEARCH SNIPPETS START ---\n" + SNIPPET_SEPARATOR.join(snippets)
+                            + "\n--- SEARCH SNIPPETS END ---")
+        content = "\n\n".join(sections)
+        return f"""
+        Based on the following material about '{query}' (partial summaries of earlier search results
+        and/or raw search snippets), generate one concise summary, removing repetition.
+        Ensure the output strictly follows the required JSON format for SummaryResult.
+
+        {content}
+
+        Generate the SummaryResult object now.
+        """
+
+    @staticmethod
+    def _bulk_prompt(tasks: List[Tuple[str, str]]) -> str:
+        sections = "\n\n".join(f"=== TASK {number} ===\nQuery: {query}\n{prompt.strip()}"
+                                for number, (query, prompt) in enumerate(tasks, start=1))
+        return f"""
+        Below are {len(tasks)} independent summarization tasks, each about its own query.
+        Answer every task on its own, using only that task's material.
+        Ensure the output strictly follows the required JSON format for BulkSummaryResult:
+        `summaries` must hold exactly {len(tasks)} SummaryResult objects, the first answering TASK 1 and so on.
+        Set each SummaryResult's `original_query` to its task's Query, exactly as written.
+
+        {sections}
 
+        Generate the BulkSummaryResult object now.
+        """
+
+    @staticmethod
+    def _refresh_prompt(query: str, previous_summary: str, new_content: str) -> str:
+        return f"""
+        Below is an existing summary about '{query}', followed by search snippets that appeared
+        since it was written. Update the summary with any new information from the snippets,
+        correcting statements they contradict and keeping it concise. Keep the existing
+        content if the snippets add nothing new.
+        Ensure the output strictly follows the required JSON format for SummaryResult.
+
+        --- PREVIOUS SUMMARY START ---
+        {previous_summary}
+        --- PREVIOUS SUMMARY END ---
+
+        --- NEW SEARCH SNIPPETS START ---
+        {new_content}
+        --- NEW SEARCH SNIPPETS END ---
+
+        Generate the SummaryResult object now.
+        """
+
+    def _invoke_structured(self, llm: BaseChatModel, query: str, prompt: str, model_name: str,
+                           deadline: Optional[float] = None) -> Tuple[SummaryResult, TokenUsage]:
+        """
+        Calls the LLM with structured output (bounded by `deadline`), validates the result and
+        returns it with the call's token usage. In batch mode `query` identifies the prompt's
+        answer in the bulk reply.
+        """
+        print(f"Summarizer Agent: Calling LLM '{model_name}' with structured output...")
+        what = f"LLM call to '{model_name}'"
+        if self.batcher is not None:
+            # Queued with the prompts of concurrent queries; the group is sent as one request
+            check(deadline, what)
+            future = self.batcher.submit(model_name, partial(self._invoke_bulk, llm, model_name), (query, prompt))
+            if not wait([future], timeout=remaining(deadline)).done:
+                if future.cancel(): # Its batch had not started: never sent
+                    raise DeadlineExceeded(f"Deadline exceeded before {what}")
+                raise CallAbandoned(f"Deadline exceeded during {what}")
+            return future.result()
+        # Use LangChain's structured output method; include_raw keeps the message with usage metadata
+        structured_llm = llm.with_structured_output(SummaryResult, include_raw=True)
+        response = call_with_deadline(structured_llm.invoke, deadline, what, prompt)
+        return self._parse_response(response, prompt, model_name)
+
+    def _invoke_bulk(self, llm: BaseChatModel, model_name: str, tasks: List[Tuple[str, str]]) -> List[Any]:
+        """
+        Batch-mode sender for SummaryBatcher: answers several (query, prompt) tasks with one LLM
+        request and returns a (SummaryResult, TokenUsage) pair or an exception per task. The
+        request's token usage is split over the tasks. An answer is only handed to a task whose
+        query it echoes; any other task is sent again on its own, as is a lone task.
+        """
+        if len(tasks) == 1:
+            return [self._invoke_single(llm, model_name, tasks[0][1])]
+
+        print(f"Summarizer Agent: Sending {len(tasks)} prompts to LLM '{model_name}' in one request...")
+        bulk_prompt = self._bulk_prompt(tasks)
+        response = llm.with_structured_output(BulkSummaryResult, include_raw=True).invoke(bulk_prompt)
+        raw_message, bulk_result = response.get("raw"), response.get("parsed")
+        if response.get("parsing_error") or not isinstance(bulk_result, BulkSummaryResult):
+            raise ValueError(f"Model '{model_name}' returned invalid bulk output: {response.get('parsing_error')}")
+        if len(bulk_result.summaries) != len(tasks):
+            raise ValueError(f"Model '{model_name}' answered {len(bulk_result.summaries)} of {len(tasks)} bulk tasks")
+        summaries = [summary_result.summary for summary_result in bulk_result.summaries]
+        usage = usage_from_response(raw_message, bulk_prompt, "".join(summaries))
+        shares = split_usage(usage, [len(prompt) for _, prompt in tasks], [len(summary) for summary in summaries])
+        results: List[Any] = []
+        for (query, prompt), summary_result, share in zip(tasks, bulk_result.summaries, shares):
+            if summary_result.original_query.strip().casefold() != query.strip().casefold():
+                # Reordered, merged or skipped tasks: the answer may belong to another query
+                print(f"Summarizer Agent: Bulk answer for '{summary_result.original_query}' does not match "
+                      f"query '{query}', sending it on its own.")
+                result = self._invoke_single(llm, model_name, prompt)
+                if not isinstance(result, Exception):
+                    result[1].add(share) # The bulk request spent tokens on this task too
+                results.append(result)
+            elif summary_result.summary.strip():
+                results.append((summary_result, share))
+            else:
+                results.append(ValueError(f"Model '{model_name}' returned an empty summary in a bulk request"))
+        return results
+
+    def _invoke_single(self, llm: BaseChatModel, model_name: str, prompt: str) -> Any:
+        """Sends one prompt of a bulk group as a normal request; returns the parsed pair or the exception."""
+        structured_llm = llm.with_structured_output(SummaryResult, include_raw=True)
+        try:
+            return self._parse_response(structured_llm.invoke(prompt), prompt, model_name)
         except Exception as e:
-            error_msg = f"Error generating summary via LLM: {e}" # Updated error message source
-            print(f"ERROR: Summarizer Agent failed for query '{original_query}': {error_msg}")
-            # Return a valid SummaryResult indicating the error
-            return SummaryResult(summary=error_msg, original_query=original_query)
+            return e
+
+    def _parse_response(self, response: Any, prompt: str, model_name: str) -> Tuple[SummaryResult, TokenUsage]:
+        """Validates one structured-output response and returns it with the call's token usage."""
+        raw_message = None
+        summary_result = response
+        if isinstance(response, dict): # {"raw": AIMessage, "parsed": SummaryResult | None, "parsing_error": ...}
+            raw_message = response.get("raw")
+            summary_result = response.get("parsed")
+            if response.get("parsing_error"):
+                raise ValueError(f"Model '{model_name}' returned invalid output: {response['parsing_error']}")
+        if not isinstance(summary_result, SummaryResult) or not summary_result.summary.strip():
+            raise ValueError(f"Model '{model_name}' returned no valid SummaryResult")
+        return summary_result, usage_from_response(raw_message, prompt, summary_result.summary)
 
 # Note: Agent instantiation is removed from here.
 # It will be handled by the graph builder or main application logic.
\ No newline at end of file
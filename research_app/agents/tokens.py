@@ -0,0 +1,102 @@
+import threading
+from typing import Any, List, Optional
+
+from .schemas import TokenUsage
+
+# Rough chars-per-token ratio used when the model response carries no usage metadata
+CHARS_PER_TOKEN = 4
+# Output tokens reserved for a summary when checking a budget before the call
+SUMMARY_OUTPUT_TOKENS_ESTIMATE = 512
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised before an LLM call when even a truncated prompt does not fit the token budget."""
+
+
+class BatchBudgetExceeded(TokenBudgetExceeded):
+    """Raised when the shared batch budget, not the query's own budget, is what ran out."""
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Cheap token estimate for text without a tokenizer round trip."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def usage_from_response(raw_message: Any, prompt: str, output_text: str) -> TokenUsage:
+    """
+    Token usage of one LLM call: taken from the response's `usage_metadata` when the
+    provider reports it, otherwise estimated from the prompt and output text.
+    """
+    metadata = getattr(raw_message, "usage_metadata", None) or {}
+    if metadata.get("input_tokens") is not None and metadata.get("output_tokens") is not None:
+        return TokenUsage(input_tokens=metadata["input_tokens"], output_tokens=metadata["output_tokens"], calls=1)
+    return TokenUsage(
+        input_tokens=estimate_tokens(prompt), output_tokens=estimate_tokens(output_text), calls=1, estimated=True
+    )
+
+
+def split_usage(usage: TokenUsage, input_weights: List[int], output_weights: List[int]) -> List[TokenUsage]:
+    """
+    Splits the usage of one bulk LLM call over the prompts it answered: input tokens in
+    proportion to each prompt's length, output tokens to each answer's. The shares are
+    flagged as estimated; each counts as one call.
+    """
+    def shares(total: int, weights: List[int]) -> List[int]:
+        weight_sum = sum(weights)
+        parts = [total * weight // weight_sum if weight_sum else total // len(weights) for weight in weights]
+        parts[-1] += total - sum(parts) # Rounding remainder
+        return parts
+
+    return [TokenUsage(input_tokens=input_tokens, output_tokens=output_tokens, calls=1, estimated=True)
+            for input_tokens, output_tokens in zip(shares(usage.input_tokens, input_weights),
+                                                   shares(usage.output_tokens, output_weights))]
+
+
+# --- TDD Anchor: test_token_budget ---
+# Test Case: An unlimited budget (limit 0) always has room.
+# Test Case: reserve/commit track usage; reservations are replaced by the actual usage.
+# Test Case: reset starts a new batch with the full limit available.
+# --- End TDD Anchor ---
+class TokenBudget:
+    """
+    Thread-safe token budget: MAX_TOKENS_PER_BATCH shared by every LLM call of a batch, or
+    MAX_TOKENS_PER_QUERY shared by the (possibly overlapping) calls of one query.
+
+    Calls reserve their estimated tokens up front and commit the actual usage afterwards,
+    so concurrent calls cannot jointly overrun the limit by more than one estimate error.
+    """
+
+    def __init__(self, limit: int = 0):
+        """`limit` is the total token budget; 0 means unlimited."""
+        self.limit = limit
+        self.used = 0
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[int]:
+        """Tokens still available (None if unlimited)."""
+        if not self.limit:
+            return None
+        with self._lock:
+            return max(0, self.limit - self.used - self._reserved)
+
+    def reserve(self, tokens: int) -> bool:
+        """Reserves `tokens` if they fit. Returns False (and reserves nothing) otherwise."""
+        with self._lock:
+            if self.limit and self.used + self._reserved + tokens > self.limit:
+                return False
+            self._reserved += tokens
+            return True
+
+    def commit(self, reserved: int, actual: int) -> None:
+        """Replaces a reservation by the tokens the call actually used."""
+        with self._lock:
+            self._reserved -= reserved
+            self.used += actual
+
+    def reset(self) -> None:
+        """Starts a new batch: forgets the tokens used so far."""
+        with self._lock:
+            self.used = 0
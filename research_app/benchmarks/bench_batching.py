@@ -0,0 +1,116 @@
+"""
+Benchmark: batch-mode summaries per second with and without the SummaryBatcher.
+
+The Gemini client is replaced by a fake model, so the benchmark runs offline. Every request
+pays a fixed overhead plus generation time per summary it answers, and the provider serves at
+most `--provider-concurrency` requests at a time (a rate-limited account):
+
+    python -m research_app.benchmarks.bench_batching --queries 32 --concurrency 16
+    python -m research_app.benchmarks.bench_batching --queries 32 --concurrency 16 --window-ms 50
+"""
+import argparse
+import contextlib
+import io
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from ..agents.batcher import SummaryBatcher
+from ..agents.schemas import BulkSummaryResult, ResearchResult, SummaryResult
+from ..agents.summarizer import SummarizerAgent
+from ..config import AppSettings
+
+
+class FakeChatModel:
+    """Stands in for ChatGoogleGenerativeAI: simulated latency, counts requests."""
+
+    def __init__(self, request_overhead: float, per_summary: float, provider_concurrency: int):
+        self.request_overhead = request_overhead
+        self.per_summary = per_summary
+        self.requests = 0
+        self._provider = threading.Semaphore(provider_concurrency)
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema, include_raw=False):
+        return _FakeStructured(self, schema)
+
+    def answer(self, schema, prompt: str) -> dict:
+        # Each bulk task starts with its "Query: ..." line, which the answer echoes
+        queries = re.findall(r"^Query: (.*)$", prompt, re.MULTILINE) if schema is BulkSummaryResult else [""]
+        with self._provider:
+            with self._lock:
+                self.requests += 1
+            time.sleep(self.request_overhead + self.per_summary * len(queries)) # Summaries are generated one after another
+        summaries = [SummaryResult(summary=f"Summary {i}.", original_query=query) for i, query in enumerate(queries)]
+        parsed = BulkSummaryResult(summaries=summaries) if schema is BulkSummaryResult else summaries[0]
+        return {"raw": None, "parsed": parsed, "parsing_error": None}
+
+
+class _FakeStructured:
+    def __init__(self, model: FakeChatModel, schema):
+        self.model = model
+        self.schema = schema
+
+    def invoke(self, prompt):
+        return self.model.answer(self.schema, prompt)
+
+
+def run_queries(agent: SummarizerAgent, queries, concurrency: int) -> float:
+    """Summarizes every query with `concurrency` in flight; returns the elapsed seconds."""
+    def summarize(query):
+        research = ResearchResult(query=query, search_results=[f"Snippet about {query}."],
+                                  raw_content=f"Snippet about {query}.")
+        return agent.run(research)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(summarize, queries))
+    assert all(result.summary.startswith("Summary") for result in results), results
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=32, help="Queries summarized per mode.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in flight (BATCH_CONCURRENCY).")
+    parser.add_argument("--request-overhead", type=float, default=0.3, help="Fixed seconds per LLM request.")
+    parser.add_argument("--per-summary", type=float, default=0.05, help="Generation seconds per summary.")
+    parser.add_argument("--provider-concurrency", type=int, default=4,
+                        help="Requests the provider serves at a time (SUMMARY_BATCH_MAX_CONCURRENCY in batched mode).")
+    parser.add_argument("--window-ms", type=float, default=0.0, help="SUMMARY_BATCH_WINDOW_MS in batched mode.")
+    args = parser.parse_args(argv)
+
+    settings = AppSettings(google_api_key="benchmark", brave_api_key="benchmark",
+                           google_llm_model_name="model", google_llm_fast_model_name="model",
+                           summary_batch_window_ms=args.window_ms,
+                           summary_batch_max_concurrency=args.provider_concurrency)
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+
+    rows = []
+    for mode in ("per-query", "batched"):
+        model = FakeChatModel(args.request_overhead, args.per_summary, args.provider_concurrency)
+        with patch("research_app.agents.summarizer.ChatGoogleGenerativeAI", return_value=model), \
+                contextlib.redirect_stdout(io.StringIO()): # The agent logs every call
+            agent = SummarizerAgent(settings)
+            if mode == "batched":
+                with SummaryBatcher(window_seconds=settings.summary_batch_window_ms / 1000,
+                                    max_batch_size=settings.summary_batch_max_size,
+                                    max_concurrency=settings.summary_batch_max_concurrency) as batcher:
+                    agent.batcher = batcher
+                    elapsed = run_queries(agent, queries, args.concurrency)
+            else:
+                elapsed = run_queries(agent, queries, args.concurrency)
+        rows.append((mode, elapsed, model.requests))
+
+    print(f"{args.queries} queries, {args.concurrency} in flight, provider serves {args.provider_concurrency} "
+          f"requests at a time ({args.request_overhead:.2f}s + {args.per_summary:.2f}s per summary)")
+    print(f"{'mode':<12}{'seconds':>10}{'summaries/s':>13}{'requests':>10}")
+    for mode, elapsed, requests in rows:
+        print(f"{mode:<12}{elapsed:>10.2f}{args.queries / elapsed:>13.2f}{requests:>10}")
+    print(f"batched speedup: {rows[0][1] / rows[1][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: storage codec vs. Pydantic's JSON round trip for a final AgentState.
+
+The baseline is Pydantic's `model_dump_json`/`model_validate_json`, for single models and for
+a Pydantic model generated from AgentState's annotations:
+
+    python -m research_app.benchmarks.bench_codec --snippets 50 --rounds 2000
+"""
+import argparse
+import time
+from typing import Optional, get_type_hints
+
+from pydantic import create_model
+
+from ..agents.schemas import ResearchResult, RoutingDecision, SummaryResult, TokenUsage
+from ..graph.state import AgentState
+from ..storage import codec
+
+
+def sample_state(snippet_count: int) -> dict:
+    snippets = [f"Snippet {i}: " + "lorem ipsum dolor sit amet " * 8 for i in range(snippet_count)]
+    return {
+        "query": "benchmark query",
+        "deadline": time.time() + 120,
+        "research_info": ResearchResult(query="benchmark query", search_results=snippets,
+                                        raw_content="\n\n---\n\n".join(snippets)),
+        "final_summary": SummaryResult(summary="A summary. " * 40, original_query="benchmark query"),
+        "routing_decision": RoutingDecision(query="benchmark query", tier="large", model_name="large-model",
+                                            reason="content length", latency_seconds=1.5),
+        "token_usage": TokenUsage(input_tokens=4000, output_tokens=300, calls=1),
+        "error_message": None,
+        "partial_result": False,
+        "timings": {"researcher": 0.8, "summarizer": 1.6},
+    }
+
+
+def time_round_trips(encode, decode, rounds: int):
+    """Returns (encode µs, decode µs, payload bytes) per round trip."""
+    data = encode()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        data = encode()
+    encoded = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(rounds):
+        decode(data)
+    decoded = time.perf_counter() - started
+    return encoded / rounds * 1e6, decoded / rounds * 1e6, len(data)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snippets", type=int, default=50, help="Search snippets in the sample state.")
+    parser.add_argument("--rounds", type=int, default=2000, help="Round trips per variant.")
+    args = parser.parse_args(argv)
+
+    state = sample_state(args.snippets)
+    research_info = state["research_info"]
+    # AgentState is a typing.TypedDict, which Pydantic only accepts on Python 3.12+; mirror it as a model
+    state_model = create_model("AgentStateModel", **{
+        key: (Optional[annotation], None) for key, annotation in get_type_hints(AgentState).items()
+    })
+    state_instance = state_model(**state)
+
+    variants = {
+        "state: pydantic": (state_instance.model_dump_json, state_model.model_validate_json),
+        "state: codec": (lambda: codec.dumps_state(state), codec.loads_state),
+        "model: pydantic": (research_info.model_dump_json, ResearchResult.model_validate_json),
+        "model: codec": (lambda: codec.dumps_model(research_info),
+                         lambda data: codec.loads_model(data, ResearchResult)),
+    }
+
+    print(f"{args.snippets} snippets, {args.rounds} round trips per variant "
+          f"({'orjson' if codec.orjson is not None else 'json'} backend)")
+    print(f"{'variant':<24}{'encode µs':>12}{'decode µs':>12}{'bytes':>9}")
+    for name, (encode, decode) in variants.items():
+        encode_us, decode_us, size = time_round_trips(encode, decode, args.rounds)
+        print(f"{name:<24}{encode_us:>12.1f}{decode_us:>12.1f}{size:>9}")
+
+
+if __name__ == "__main__":
+    main()
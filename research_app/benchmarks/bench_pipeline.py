@@ -0,0 +1,107 @@
+"""
+Benchmark: sequential researcher -> summarizer graph vs. the pipelined graph.
+
+Brave and the LLM are replaced by simulated latencies, so the benchmark runs offline
+and measures latency, LLM calls and (estimated) tokens per query. By default all pages
+land together, as concurrent Brave requests do; `--search-step` makes later pages lag behind:
+
+    python -m research_app.benchmarks.bench_pipeline --pages 4 --queries 3
+    python -m research_app.benchmarks.bench_pipeline --pages 4 --search-step 0.5
+
+Pipelining trades LLM calls for latency: every partial summary is an extra call, and its
+output is read again by the final call.
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import time
+from unittest.mock import patch
+
+from ..agents.researcher import ResearcherAgent, RESULTS_PER_PAGE
+from ..agents.schemas import SummaryResult, TokenUsage
+from ..agents.summarizer import SummarizerAgent
+from ..agents.tokens import usage_from_response
+from ..config import AppSettings
+from ..graph.builder import build_graph
+
+
+def simulated_search_page(search_base: float, search_step: float):
+    """Fake `_search_page`: page N lands after search_base + N * search_step seconds."""
+    def search_page(self, query, offset, deadline):
+        time.sleep(search_base + offset * search_step)
+        # Brave descriptions run to a few hundred characters
+        return [f"Snippet {offset}.{i} about {query}: " + "lorem ipsum dolor sit amet " * 8
+                for i in range(RESULTS_PER_PAGE)], None
+    return search_page
+
+
+def simulated_llm(llm_base: float, llm_per_snippet: float, total: TokenUsage):
+    """Fake `_invoke_structured`: latency grows with the number of snippets in the prompt; adds up usage."""
+    def invoke_structured(self, llm, query, prompt, model_name, deadline=None):
+        snippets = max(1, prompt.count("\n---\n") + 1)
+        time.sleep(llm_base + llm_per_snippet * snippets)
+        summary = f"Summary of {snippets} items. " + "Key fact. " * 20
+        usage = usage_from_response(None, prompt, summary) # Estimated from the text
+        total.add(usage)
+        return SummaryResult(summary=summary, original_query=""), usage
+    return invoke_structured
+
+
+def time_graph(graph, queries):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        final_state = graph.invoke({"query": query})
+        latencies.append(time.perf_counter() - started)
+        assert final_state.get("final_summary"), final_state.get("error_message")
+    return latencies
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=4, help="Result pages (search batches) per query.")
+    parser.add_argument("--queries", type=int, default=3, help="Queries per mode.")
+    parser.add_argument("--search-base", type=float, default=0.4, help="Seconds until the first page lands.")
+    parser.add_argument("--search-step", type=float, default=0.0,
+                        help="Extra seconds per later page (0 = pages land together).")
+    parser.add_argument("--llm-base", type=float, default=0.3, help="Fixed seconds per LLM call.")
+    parser.add_argument("--llm-per-snippet", type=float, default=0.06, help="Extra LLM seconds per snippet.")
+    parser.add_argument("--map-skew", type=float, default=None,
+                        help="PIPELINE_MAP_SKEW_SECONDS for the pipelined mode (default: the setting's default).")
+    args = parser.parse_args(argv)
+
+    settings = AppSettings(
+        google_api_key="benchmark", brave_api_key="benchmark",
+        google_llm_fast_model_name="gemini-2.0-flash", research_pages=args.pages,
+    )
+    if args.map_skew is not None:
+        settings.pipeline_map_skew_seconds = args.map_skew
+    queries = [f"benchmark query {i}" for i in range(args.queries)]
+
+    results = {}
+    usage = {}
+    for mode, pipelined in (("sequential", False), ("pipelined", True)):
+        usage[mode] = TokenUsage()
+        with patch.object(ResearcherAgent, "_search_page", simulated_search_page(args.search_base, args.search_step)), \
+                patch.object(SummarizerAgent, "_invoke_structured",
+                             simulated_llm(args.llm_base, args.llm_per_snippet, usage[mode])), \
+                contextlib.redirect_stdout(io.StringIO()): # The agents log every step
+            graph = build_graph(settings, pipelined=pipelined)
+            results[mode] = time_graph(graph, queries)
+            time.sleep(args.llm_base + args.llm_per_snippet * RESULTS_PER_PAGE * args.pages) # Let abandoned map calls finish
+
+    print(f"{args.pages} pages/query, {args.queries} queries per mode, "
+          f"pages {args.search_step:.2f}s apart, map skew {settings.pipeline_map_skew_seconds:.2f}s")
+    print(f"{'mode':<12}{'mean s':>10}{'min s':>10}{'max s':>10}{'LLM calls':>11}{'tokens':>10}")
+    for mode, latencies in results.items():
+        print(f"{mode:<12}{statistics.mean(latencies):>10.3f}{min(latencies):>10.3f}{max(latencies):>10.3f}"
+              f"{usage[mode].calls / len(queries):>11.2f}{usage[mode].total_tokens / len(queries):>10.0f}")
+    speedup = statistics.mean(results["sequential"]) / statistics.mean(results["pipelined"])
+    extra_calls = (usage["pipelined"].calls - usage["sequential"].calls) / len(queries)
+    token_ratio = usage["pipelined"].total_tokens / usage["sequential"].total_tokens
+    print(f"pipelined: {speedup:.2f}x faster for {extra_calls:+.2f} LLM calls and {token_ratio:.2f}x tokens per query")
+
+
+if __name__ == "__main__":
+    main()
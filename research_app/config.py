@@ -14,6 +14,23 @@ class AppSettings(BaseModel):
     google_api_key: str = Field(..., description="API Key for the Google Generative AI") # Renamed from llm_api_key
     brave_api_key: str = Field(..., description="API Key for the Brave Search API") # Renamed from search_api_key
     google_llm_model_name: str = Field(default="gemini-pro", description="Name of the Google LLM model to use") # Renamed and updated default
+    # Model routing: small/simple inputs go to the fast model, everything else to google_llm_model_name
+    google_llm_fast_model_name: str = Field(default="gemini-2.0-flash", description="Name of the fast, cheap Google LLM model used for small inputs")
+    routing_fast_max_chars: int = Field(default=6000, description="Max research content length (chars) still routed to the fast model")
+    routing_fast_max_snippets: int = Field(default=5, description="Max number of search snippets still routed to the fast model")
+    routing_fast_max_query_words: int = Field(default=24, description="Max query length (words) still routed to the fast model")
+    research_pages: int = Field(default=1, description="Number of Brave result pages (5 results each) fetched per query")
+    pipelined_execution: bool = Field(default=False, description="Summarize result batches while later searches are still running")
+    pipeline_map_skew_seconds: float = Field(default=0.25, description="Pipelined mode: seconds without a new page before landed batches get a partial summary")
+    pipeline_map_wait_seconds: float = Field(default=2.0, description="Pipelined mode: how long the final call waits for partial summaries still running")
+    query_timeout_seconds: float = Field(default=120.0, description="End-to-end time budget per query in seconds (0 disables the deadline)")
+    llm_max_retries: int = Field(default=1, description="Retries of a failed LLM request; all attempts together fit in query_timeout_seconds")
+    max_tokens_per_query: int = Field(default=0, description="LLM token budget (input + output) per query (0 = unlimited)")
+    max_tokens_per_batch: int = Field(default=0, description="LLM token budget shared by all queries of a batch run, or of one batch of jobs claimed by a queue worker (0 = unlimited)")
+    batch_concurrency: int = Field(default=4, description="Queries run concurrently in batch mode (1 runs them one by one)")
+    summary_batch_window_ms: float = Field(default=0.0, description="Extra time summarization prompts are collected before they are sent (0 = send as soon as a request slot is free)")
+    summary_batch_max_size: int = Field(default=8, description="Prompts per bulk LLM request; a full batch is sent without waiting for the window")
+    summary_batch_max_concurrency: int = Field(default=4, description="LLM requests in flight in batch mode; prompts that find every slot busy share one request")
 
 def load_settings() -> AppSettings:
     """Loads settings from environment variables."""
@@ -23,7 +40,23 @@ def load_settings() -> AppSettings:
         settings = AppSettings(
             google_api_key=os.getenv("GOOGLE_API_KEY"), # Updated env var name
             brave_api_key=os.getenv("BRAVE_API_KEY"), # Updated env var name
-            google_llm_model_name=os.getenv("GOOGLE_LLM_MODEL_NAME", "gemini-2.5-pro-preview-03-25") # Updated env var name and default
+            google_llm_model_name=os.getenv("GOOGLE_LLM_MODEL_NAME", "gemini-2.5-pro-preview-03-25"), # Updated env var name and default
+            google_llm_fast_model_name=os.getenv("GOOGLE_LLM_FAST_MODEL_NAME", "gemini-2.0-flash"),
+            routing_fast_max_chars=os.getenv("ROUTING_FAST_MAX_CHARS", 6000),
+            routing_fast_max_snippets=os.getenv("ROUTING_FAST_MAX_SNIPPETS", 5),
+            routing_fast_max_query_words=os.getenv("ROUTING_FAST_MAX_QUERY_WORDS", 24),
+            research_pages=os.getenv("RESEARCH_PAGES", 1),
+            pipelined_execution=os.getenv("PIPELINED_EXECUTION", False),
+            pipeline_map_skew_seconds=os.getenv("PIPELINE_MAP_SKEW_SECONDS", 0.25),
+            pipeline_map_wait_seconds=os.getenv("PIPELINE_MAP_WAIT_SECONDS", 2.0),
+            query_timeout_seconds=os.getenv("QUERY_TIMEOUT_SECONDS", 120.0),
+            llm_max_retries=os.getenv("LLM_MAX_RETRIES", 1),
+            max_tokens_per_query=os.getenv("MAX_TOKENS_PER_QUERY", 0),
+            max_tokens_per_batch=os.getenv("MAX_TOKENS_PER_BATCH", 0),
+            batch_concurrency=os.getenv("BATCH_CONCURRENCY", 4),
+            summary_batch_window_ms=os.getenv("SUMMARY_BATCH_WINDOW_MS", 0.0),
+            summary_batch_max_size=os.getenv("SUMMARY_BATCH_MAX_SIZE", 8),
+            summary_batch_max_concurrency=os.getenv("SUMMARY_BATCH_MAX_CONCURRENCY", 4),
         )
         print("Configuration loaded successfully.")
         return settings
@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .thread_hooks import carry_context
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a query's overall time budget runs out."""
+
+
+class CallAbandoned(DeadlineExceeded):
+    """Raised when the deadline passes while a call is in flight; the call keeps running in its thread."""
+
+
+def new_deadline(timeout_seconds: Optional[float]) -> Optional[float]:
+    """Returns an absolute deadline (epoch seconds) `timeout_seconds` from now, or None if disabled (<= 0)."""
+    if not timeout_seconds or timeout_seconds <= 0:
+        return None
+    return time.time() + timeout_seconds
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until `deadline` (never negative), or None if there is no deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def check(deadline: Optional[float], what: str) -> None:
+    """Raises DeadlineExceeded if `deadline` has already passed."""
+    if deadline is not None and time.time() >= deadline:
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+
+def capped_timeout(deadline: Optional[float], timeout: float) -> float:
+    """Returns `timeout` shortened to the time left before `deadline`."""
+    left = remaining(deadline)
+    return timeout if left is None else min(timeout, left)
+
+
+# --- TDD Anchor: test_call_with_deadline ---
+# Test Case: Returns the function result when it finishes in time.
+# Test Case: Re-raises exceptions from the function.
+# Test Case: Raises CallAbandoned (a DeadlineExceeded) without waiting for a function that overruns.
+# --- End TDD Anchor ---
+def call_with_deadline(fn: Callable[..., Any], deadline: Optional[float], what: str, *args, **kwargs) -> Any:
+    """
+    Calls `fn(*args, **kwargs)` and stops waiting for it once `deadline` passes.
+
+    Blocking calls without their own timeout (e.g. LangChain `invoke`) run in a daemon
+    thread; when the deadline expires the caller gets CallAbandoned (a DeadlineExceeded)
+    immediately and the abandoned call's result is discarded.
+    """
+    if deadline is None:
+        return fn(*args, **kwargs)
+    check(deadline, what)
+
+    outcome: dict = {}
+    finished = threading.Event()
+
+    def target():
+        try:
+            outcome["result"] = fn(*args, **kwargs)
+        except BaseException as e: # Re-raised in the caller's thread
+            outcome["error"] = e
+        finally:
+            finished.set()
+
+    threading.Thread(target=carry_context(target), name=f"deadline-call: {what}", daemon=True).start()
+    if not finished.wait(remaining(deadline)):
+        raise CallAbandoned(f"Deadline exceeded during {what}")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
@@ -1,12 +1,25 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
 from functools import partial
 
 # Import the state definition and agent classes
 from .state import AgentState
-from ..agents.researcher import ResearcherAgent
-from ..agents.summarizer import SummarizerAgent
+from ..agents.researcher import ResearcherAgent, snippet_fingerprint
+from ..agents.summarizer import SummarizerAgent, SNIPPET_SEPARATOR
+from ..agents.batcher import SummaryBatcher
+from ..agents.router import ModelRouter
+from ..agents.schemas import ResearchResult, SummaryResult, TokenUsage
+from ..agents.tokens import BatchBudgetExceeded, TokenBudget, TokenBudgetExceeded, estimate_tokens
 from ..config import AppSettings # For type hinting
+from ..deadline import DeadlineExceeded, capped_timeout
+from ..thread_hooks import carry_context
+
+# refresh_status values: no previous result, no new snippets (LLM skipped), delta summary of new snippets
+REFRESH_NEW = "new"
+REFRESH_UNCHANGED = "unchanged"
+REFRESH_UPDATED = "updated"
 
 # --- Node Functions (Modified to accept agent instances) ---
 
@@ -14,6 +27,7 @@ from ..config import AppSettings # For type hinting
 # Test Case: Input state with query, mock researcher_agent.run, verify state update with research_info.
 # Test Case: Handle exceptions from researcher_agent.run, verify state update with error_message.
 # Test Case: Test with missing 'query' in input state.
+# Test Case: Deadline expires during research, verify error_message and partial_result flag.
 # --- End TDD Anchor ---
 def execute_research(state: AgentState, researcher: ResearcherAgent) -> Dict[str, Any]:
     """Node that executes the researcher agent."""
@@ -25,7 +39,7 @@ def execute_research(state: AgentState, researcher: ResearcherAgent) -> Dict[str
 
     try:
         print(f"Calling Researcher Agent for query: '{query}'")
-        research_result = researcher.run(query)
+        research_result = researcher.run(query, deadline=state.get("deadline"))
         print("Researcher Agent finished.")
         # Check if the agent itself caught an error during its run
         if research_result and research_result.raw_content and "Error during" in research_result.raw_content:
@@ -36,6 +50,11 @@ def execute_research(state: AgentState, researcher: ResearcherAgent) -> Dict[str
         else:
              # Clear any previous error if successful
              return {"research_info": research_result, "error_message": None}
+    except DeadlineExceeded as e:
+        # Nothing usable was gathered yet; flag the run as partial and stop here
+        error_msg = f"Research did not finish: {e}"
+        print(f"ERROR: {error_msg}")
+        return {"research_info": None, "error_message": error_msg, "partial_result": True}
     except Exception as e:
         error_msg = f"Research node execution failed: {e}"
         print(f"ERROR: {error_msg}")
@@ -47,6 +66,9 @@ def execute_research(state: AgentState, researcher: ResearcherAgent) -> Dict[str
 # Test Case: Input state with error_message from previous step, verify node skips or handles error.
 # Test Case: Input state with None research_info, verify handling.
 # Test Case: Handle exceptions from summarizer_agent.run, verify state update with error_message.
+# Test Case: Deadline expires during summarization, verify raw snippets are returned flagged as partial.
+# Test Case: Token budget exhausted, verify the LLM is skipped and raw snippets are returned flagged as partial.
+# Test Case: Refresh with a previous result, verify unchanged results skip the LLM and new snippets get a delta summary.
 # --- End TDD Anchor ---
 def execute_summary(state: AgentState, summarizer: SummarizerAgent) -> Dict[str, Any]:
     """Node that executes the summarizer agent."""
@@ -64,25 +86,273 @@ def execute_summary(state: AgentState, summarizer: SummarizerAgent) -> Dict[str,
          print(f"ERROR: {error_msg}")
          return {"final_summary": None, "error_message": error_msg}
 
+    if _is_refresh(state):
+        return refresh_summary(state, research_info, summarizer)
+
+    token_usage = TokenUsage()
     try:
         print(f"Calling Summarizer Agent for query: '{research_info.query}'")
-        summary_result = summarizer.run(research_info)
+        summary_result = summarizer.run(research_info, deadline=state.get("deadline"), usage=token_usage)
+        routing_decision = summarizer.last_routing_decision
         print("Summarizer Agent finished.")
         # Check if the agent itself caught an error (e.g., PydanticAI failure)
         if summary_result and "Error generating summary" in summary_result.summary:
              error_msg = f"Summarization failed internally: {summary_result.summary}"
              print(f"ERROR: {error_msg}")
              # Pass partial result + error message
-             return {"final_summary": summary_result, "error_message": error_msg}
+             return {"final_summary": summary_result, "routing_decision": routing_decision,
+                     "token_usage": token_usage, "error_message": error_msg}
         else:
              # Clear any previous error if successful
-             return {"final_summary": summary_result, "error_message": None}
+             return {"final_summary": summary_result, "routing_decision": routing_decision,
+                     "token_usage": token_usage, "error_message": None}
+    except (DeadlineExceeded, TokenBudgetExceeded) as e:
+        print(f"Summary did not finish ({e}), returning raw snippets as a partial result.")
+        return {
+            "final_summary": build_partial_summary(research_info, str(e)),
+            "routing_decision": summarizer.last_routing_decision,
+            "token_usage": token_usage,
+            "error_message": None,
+            "partial_result": True,
+            "budget_exhausted": isinstance(e, BatchBudgetExceeded),
+        }
     except Exception as e:
         error_msg = f"Summary node execution failed: {e}"
         print(f"ERROR: {error_msg}")
         return {"final_summary": None, "error_message": error_msg}
 
 
+# --- TDD Anchor: test_pipeline_node ---
+# Test Case: Landed snippet batches are summarized once later batches lag behind by map_skew_seconds.
+# Test Case: Pages that land together get no map calls: everything goes to one reduce call.
+# Test Case: The reduce call waits up to map_wait_seconds for running partial summaries.
+# Test Case: The last batch, and batches whose partial summary is unfinished or failed, go to the
+#            final reduce call as raw snippets together with the finished partial summaries.
+# Test Case: Research errors on every page set error_message like execute_research.
+# Test Case: Deadline expiry or an exhausted token budget returns partial summaries and/or raw
+#            snippets, flagged as partial.
+# Test Case: Refresh with a previous result skips the map calls and summarizes only new snippets.
+# --- End TDD Anchor ---
+def execute_pipeline(state: AgentState, researcher: ResearcherAgent, summarizer: SummarizerAgent,
+                     map_skew_seconds: float = 0.25, map_wait_seconds: float = 2.0) -> Dict[str, Any]:
+    """
+    Node that runs research and summarization as a pipeline.
+
+    Search pages are fetched concurrently and usually land together; then a single reduce
+    call summarizes everything, like the sequential graph. Only when the remaining pages lag
+    behind for `map_skew_seconds` do the batches landed so far get a partial (map) summary,
+    so the LLM call overlaps with the searches still in flight. Once the last page lands,
+    the reduce call waits up to `map_wait_seconds` for running map calls, then combines the
+    finished partial summaries with the raw snippets of every other batch. In refresh mode,
+    no map calls are made: only the snippets that are new since the previous result get summarized.
+    """
+    print("--- Graph Node: execute_pipeline ---")
+    query = state.get("query")
+    if not query:
+        print("ERROR: No query found in state for research.")
+        return {"error_message": "Input Error: Query not provided."}
+    deadline = state.get("deadline")
+    refreshing = _is_refresh(state)
+    token_usage = TokenUsage() # Shared by the map calls and the reduce call
+    query_budget = summarizer.new_query_budget() # Map and reduce calls overlap: they reserve from one budget
+
+    snippets: List[str] = []
+    research_errors: List[str] = []
+    unsummarized: List[str] = [] # Snippets that go to the reduce call raw
+    landed_unmapped: List[str] = [] # Snippets of early pages waiting to see whether later pages lag behind
+    map_calls = [] # (future, batch) pairs
+    executor = ThreadPoolExecutor(max_workers=researcher.pages, thread_name_prefix="pipeline-map")
+    summarize_batch = carry_context(summarizer.summarize_batch)
+    landed = 0
+    try:
+        try:
+            pages = researcher.iter_result_batches(query, deadline=deadline,
+                                                   idle_timeout=None if refreshing else map_skew_seconds)
+            for page in pages:
+                if page is None:
+                    # Later pages lag behind: summarize what has landed while they are still in flight
+                    if landed_unmapped:
+                        map_calls.append((executor.submit(summarize_batch, query, landed_unmapped, deadline,
+                                                          usage=token_usage, query_budget=query_budget),
+                                          landed_unmapped))
+                        print(f"Pipeline: partial summary #{len(map_calls)} started while searches continue.")
+                        landed_unmapped = []
+                    continue
+                batch, error_msg = page
+                landed += 1
+                if error_msg:
+                    research_errors.append(error_msg)
+                if not batch:
+                    continue
+                snippets.extend(batch)
+                if landed < researcher.pages and not refreshing:
+                    landed_unmapped.extend(batch)
+                else:
+                    unsummarized.extend(batch) # Last page: no time left to gain from a separate map call
+            unsummarized.extend(landed_unmapped) # Landed close to the last page: no latency to hide
+        except DeadlineExceeded as e:
+            research_info = ResearcherAgent.combine(query, snippets, research_errors)
+            return _pipeline_partial_result(research_info, [], snippets, e, _reported_usage(token_usage, map_calls))
+
+        research_info = ResearcherAgent.combine(query, snippets, research_errors)
+        if not snippets:
+            if research_errors:
+                error_msg = f"Research failed internally: {research_info.raw_content}"
+                print(f"ERROR: {error_msg}")
+                return {"research_info": research_info, "error_message": error_msg}
+            # Nothing to summarize; mirror SummarizerAgent.run's message for empty content
+            return {
+                "research_info": research_info,
+                "final_summary": SummaryResult(summary="No valid content found to summarize.", original_query=query),
+                "error_message": None,
+            }
+        if refreshing:
+            return {"research_info": research_info, **refresh_summary(state, research_info, summarizer)}
+
+        if map_calls:
+            # A map call that is nearly done is cheaper to wait for than to redo inside the reduce call
+            wait([future for future, _ in map_calls], timeout=capped_timeout(deadline, map_wait_seconds))
+        partial_summaries: List[str] = []
+        for future, batch in map_calls:
+            if future.done() and not future.exception():
+                partial_summaries.append(future.result())
+            else:
+                # Unfinished or failed: do not wait longer, summarize this batch from its raw snippets instead
+                future.cancel()
+                unsummarized.extend(batch)
+
+        try:
+            print(f"Pipeline: Reducing {len(partial_summaries)} partial summaries and {len(unsummarized)} snippets.")
+            final_summary = summarizer.reduce(query, partial_summaries, deadline, snippets=unsummarized,
+                                              usage=token_usage, query_budget=query_budget)
+        except (DeadlineExceeded, TokenBudgetExceeded) as e:
+            return _pipeline_partial_result(research_info, partial_summaries, unsummarized, e,
+                                            _reported_usage(token_usage, map_calls))
+        except Exception as e:
+            error_msg = f"Summarization failed internally: Error generating summary via LLM: {e}"
+            print(f"ERROR: {error_msg}")
+            return {"research_info": research_info, "final_summary": None,
+                    "token_usage": _reported_usage(token_usage, map_calls), "error_message": error_msg}
+
+        return {
+            "research_info": research_info,
+            "final_summary": final_summary,
+            "routing_decision": summarizer.last_routing_decision,
+            "token_usage": _reported_usage(token_usage, map_calls),
+            "error_message": None,
+        }
+    finally:
+        # Outstanding map calls are abandoned, not awaited, once the node returns
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def refresh_summary(state: AgentState, research_info: ResearchResult, summarizer: SummarizerAgent) -> Dict[str, Any]:
+    """
+    Refresh-mode summary: reuses the previous summary if no snippet is new (no LLM call),
+    otherwise updates it from the new snippets only.
+
+    Snippets count as seen if any earlier run summarized them (`previous_fingerprints`), not
+    only the previous run, so results that drop out and come back are not summarized again.
+    The fingerprints the new summary covers are returned as `snippet_fingerprints`.
+    """
+    previous_summary = state["previous_summary"]
+    seen = state.get("previous_fingerprints")
+    if seen is None: # Archived before fingerprints were carried forward
+        seen = [snippet_fingerprint(snippet) for snippet in state["previous_research"].search_results]
+    new_snippets = ResearcherAgent.new_snippets(seen, research_info)
+    covered = sorted(set(seen).union(snippet_fingerprint(snippet) for snippet in new_snippets))
+    token_usage = TokenUsage()
+    if not new_snippets:
+        print("Refresh: no new snippets since the previous result, reusing its summary.")
+        return {"final_summary": previous_summary, "refresh_status": REFRESH_UNCHANGED,
+                "snippet_fingerprints": covered, "token_usage": token_usage, "error_message": None}
+
+    print(f"Refresh: {len(new_snippets)}/{len(research_info.search_results)} snippets are new, updating the summary.")
+    delta = ResearchResult(query=research_info.query, search_results=new_snippets,
+                           raw_content=SNIPPET_SEPARATOR.join(new_snippets))
+    update = {"refresh_status": REFRESH_UPDATED, "token_usage": token_usage}
+    try:
+        final_summary = summarizer.refresh(previous_summary, delta, deadline=state.get("deadline"), usage=token_usage)
+    except (DeadlineExceeded, TokenBudgetExceeded) as e:
+        print(f"Refresh did not finish ({e}), returning the previous summary and new snippets as a partial result.")
+        return {**update, "final_summary": build_partial_summary(delta, str(e), [previous_summary.summary], new_snippets),
+                "routing_decision": summarizer.last_routing_decision, "error_message": None, "partial_result": True,
+                "budget_exhausted": isinstance(e, BatchBudgetExceeded)}
+    except Exception as e:
+        error_msg = f"Summarization failed internally: Error generating summary via LLM: {e}"
+        print(f"ERROR: {error_msg}")
+        return {**update, "final_summary": None, "error_message": error_msg}
+    return {**update, "final_summary": final_summary, "routing_decision": summarizer.last_routing_decision,
+            "snippet_fingerprints": covered, "error_message": None}
+
+
+def _is_refresh(state: AgentState) -> bool:
+    return state.get("previous_summary") is not None and state.get("previous_research") is not None
+
+
+def _reported_usage(token_usage: TokenUsage, map_calls: List) -> TokenUsage:
+    """
+    Copy of a pipelined run's token usage for the final state. Map calls still running are
+    abandoned when the node returns but keep spending tokens, so their prompts are added as estimates.
+    """
+    running = [batch for future, batch in map_calls if future.running()]
+    reported = token_usage.model_copy() # Abandoned map calls add to token_usage after the node returns
+    for batch in running:
+        reported.add(TokenUsage(input_tokens=estimate_tokens(SNIPPET_SEPARATOR.join(batch)), calls=1, estimated=True))
+    return reported
+
+
+def _pipeline_partial_result(research_info: ResearchResult, partial_summaries: List[str],
+                             unsummarized: List[str], error: Exception, token_usage: TokenUsage) -> Dict[str, Any]:
+    """State update for a pipelined run that hit its deadline or exhausted its token budget."""
+    reason = str(error)
+    print(f"Pipeline did not finish ({reason}), returning the best available partial result.")
+    if not research_info.search_results:
+        return {"research_info": None, "error_message": f"Research did not finish: {reason}", "partial_result": True}
+    return {
+        "research_info": research_info,
+        "final_summary": build_partial_summary(research_info, reason, partial_summaries, unsummarized),
+        "token_usage": token_usage,
+        "error_message": None,
+        "partial_result": True,
+        "budget_exhausted": isinstance(error, BatchBudgetExceeded),
+    }
+
+
+def build_partial_summary(research_info: ResearchResult, reason: str,
+                          partial_summaries: Optional[List[str]] = None,
+                          unsummarized: Optional[List[str]] = None) -> SummaryResult:
+    """
+    Builds the best available result when the summary did not make it: any partial
+    summaries that finished plus the snippets they do not cover, otherwise the raw snippets.
+    """
+    if partial_summaries:
+        body = "\n".join(f"- {partial_summary}" for partial_summary in partial_summaries)
+        if unsummarized:
+            body += "\nUnsummarized snippets:\n" + "\n".join(f"- {snippet}" for snippet in unsummarized)
+        return SummaryResult(
+            summary=f"[PARTIAL RESULT: {reason}] Partial summaries:\n{body}",
+            original_query=research_info.query,
+        )
+    snippets = research_info.search_results or ([research_info.raw_content] if research_info.raw_content else [])
+    body = "\n".join(f"- {snippet}" for snippet in snippets) or "(no snippets)"
+    return SummaryResult(
+        summary=f"[PARTIAL RESULT: {reason}] Raw search snippets:\n{body}",
+        original_query=research_info.query,
+    )
+
+
+def timed_node(name: str, node: Callable[[AgentState], Dict[str, Any]]) -> Callable[[AgentState], Dict[str, Any]]:
+    """Wraps a node so its wall-clock time is merged into the state's `timings` under `name`."""
+    def run_timed(state: AgentState) -> Dict[str, Any]:
+        started = time.perf_counter()
+        update = node(state)
+        timings = dict(state.get("timings") or {})
+        timings[name] = time.perf_counter() - started
+        return {**update, "timings": timings}
+    return run_timed
+
+
 # --- Graph Definition ---
 
 # --- TDD Anchor: test_graph_build_and_flow ---
@@ -92,10 +362,24 @@ def execute_summary(state: AgentState, summarizer: SummarizerAgent) -> Dict[str,
 # Test Case: Simulate an error in the summary node, verify the graph terminates or handles error state correctly.
 # Test Case: Test graph build failure if agent instantiation fails.
 # --- End TDD Anchor ---
-def build_graph(settings: AppSettings):
+def build_graph(settings: AppSettings,
+                node_wrapper: Optional[Callable[[str, Callable], Callable]] = None,
+                pipelined: Optional[bool] = None,
+                summary_batcher: Optional[SummaryBatcher] = None,
+                token_budget: Optional[TokenBudget] = None,
+                model_router: Optional[ModelRouter] = None):
     """
     Builds and compiles the LangGraph.
     Instantiates agents internally based on provided settings.
+
+    If `node_wrapper` is given (e.g. `NodeProfiler.wrap`), every node is passed through
+    `node_wrapper(name, node)` before being added; otherwise nodes are added unwrapped.
+    `pipelined` (default: `settings.pipelined_execution`) replaces the sequential
+    researcher -> summarizer nodes with a single pipelined node. If `summary_batcher` is
+    given, the summarizer's LLM calls go through it (used when a batch runs queries concurrently).
+    `token_budget` replaces the summarizer's MAX_TOKENS_PER_BATCH budget, so the caller decides
+    what a batch is (a batch run, or one claim of queue jobs) and can reset it.
+    `model_router` replaces the summarizer's router, so the caller can report its decisions.
     """
     if not settings:
         print("ERROR: Cannot build graph, settings object is missing.")
@@ -105,6 +389,11 @@ def build_graph(settings: AppSettings):
         # Instantiate agents *inside* the builder, ensuring settings are valid first
         researcher = ResearcherAgent(settings)
         summarizer = SummarizerAgent(settings)
+        summarizer.batcher = summary_batcher
+        if token_budget is not None:
+            summarizer.batch_budget = token_budget
+        if model_router is not None:
+            summarizer.router = model_router
         print("Agents instantiated successfully for graph building.")
     except ValueError as e:
         print(f"ERROR: Failed to instantiate agents during graph build: {e}")
@@ -115,12 +404,20 @@ def build_graph(settings: AppSettings):
         return None
 
 
+    if pipelined is None:
+        pipelined = settings.pipelined_execution
+    if pipelined:
+        return _build_pipelined_graph(researcher, summarizer, settings, node_wrapper)
+
     print("Building LangGraph workflow...")
     workflow = StateGraph(AgentState)
 
     # Use partial to bind the instantiated agent to its corresponding node function
-    research_node = partial(execute_research, researcher=researcher)
-    summary_node = partial(execute_summary, summarizer=summarizer)
+    research_node = timed_node("researcher", partial(execute_research, researcher=researcher))
+    summary_node = timed_node("summarizer", partial(execute_summary, summarizer=summarizer))
+    if node_wrapper:
+        research_node = node_wrapper("researcher", research_node)
+        summary_node = node_wrapper("summarizer", summary_node)
 
     # Add nodes
     workflow.add_node("researcher", research_node)
@@ -146,6 +443,32 @@ def build_graph(settings: AppSettings):
         print(f"ERROR: Failed to compile graph: {e}")
         return None
 
+
+def _build_pipelined_graph(researcher: ResearcherAgent, summarizer: SummarizerAgent, settings: AppSettings,
+                           node_wrapper: Optional[Callable[[str, Callable], Callable]] = None):
+    """Builds the pipelined variant: a single 'pipeline' node that overlaps research and summarization."""
+    print("Building pipelined LangGraph workflow...")
+    workflow = StateGraph(AgentState)
+
+    pipeline_node = timed_node("pipeline", partial(execute_pipeline, researcher=researcher, summarizer=summarizer,
+                                                   map_skew_seconds=settings.pipeline_map_skew_seconds,
+                                                   map_wait_seconds=settings.pipeline_map_wait_seconds))
+    if node_wrapper:
+        pipeline_node = node_wrapper("pipeline", pipeline_node)
+
+    workflow.add_node("pipeline", pipeline_node)
+    workflow.set_entry_point("pipeline")
+    workflow.add_edge("pipeline", END)
+    print("Pipeline node added: pipeline -> END")
+
+    try:
+        app_graph = workflow.compile()
+        print("Graph compiled successfully.")
+        return app_graph
+    except Exception as e:
+        print(f"ERROR: Failed to compile graph: {e}")
+        return None
+
 # Note: Graph instantiation is removed from here.
 # It should happen in the main application entry point (main.py)
 # after loading settings, like: research_graph = build_graph(app_settings)
\ No newline at end of file
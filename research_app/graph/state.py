@@ -1,8 +1,8 @@
 # Pseudocode for research_app/graph/state.py
 
-from typing import TypedDict, Optional, Dict, Any
+from typing import TypedDict, Optional, Dict, Any, List
 # Import the actual schemas when implemented
-from ..agents.schemas import ResearchResult, SummaryResult
+from ..agents.schemas import ResearchResult, SummaryResult, RoutingDecision, TokenUsage
 
 # --- TDD Anchor: test_graph_state_definition ---
 # Test Case: Ensure AgentState structure is correct (keys and types).
@@ -18,6 +18,11 @@ class AgentState(TypedDict, total=False):
     """
     # Input
     query: str
+    deadline: Optional[float] # Absolute deadline (epoch seconds) every node and external call respects
+    # Refresh mode: the archived result for the query; summarization then only covers new snippets
+    previous_research: Optional[ResearchResult]
+    previous_summary: Optional[SummaryResult]
+    previous_fingerprints: Optional[List[str]] # Fingerprints of every snippet previous_summary already covers
 
     # Intermediate results
     research_info: Optional[ResearchResult] # Output of researcher
@@ -25,9 +30,18 @@ class AgentState(TypedDict, total=False):
 
     # Final output
     final_summary: Optional[SummaryResult] # Output of summarizer
+    routing_decision: Optional[RoutingDecision] # Which model produced the summary, and its latency
+    token_usage: Optional[TokenUsage] # LLM tokens spent on the query (measured or estimated)
+    refresh_status: Optional[str] # Refresh mode only: 'new', 'unchanged' (LLM skipped) or 'updated'
+    snippet_fingerprints: Optional[List[str]] # Refresh mode only: fingerprints final_summary covers, carried forward
 
     # Error tracking
     error_message: Optional[str] # To capture errors during flow
+    partial_result: bool # True if the deadline or token budget ran out and final_summary holds the best available partial result
+    budget_exhausted: bool # True if the batch token budget was what ran out; a later batch can retry the query
+
+    # Diagnostics
+    timings: Dict[str, float] # Wall-clock seconds spent in each graph node
 
     # Optional: Could add configuration or other shared resources if needed
     # config: Optional[Dict[str, Any]]
\ No newline at end of file
@@ -0,0 +1,214 @@
+import sqlite3
+import time
+import uuid
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result BLOB,
+    last_error TEXT,
+    lease TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim_idx ON jobs (status, priority DESC, visible_at, id);
+"""
+
+
+class Job(BaseModel):
+    """A research job as stored in the queue."""
+    id: int = Field(description="Queue-assigned job id")
+    query: str = Field(description="The research query to run")
+    priority: int = Field(default=0, description="Higher priorities are claimed first")
+    status: str = Field(default=QUEUED, description="queued, running, done or dead")
+    attempts: int = Field(default=0, description="Number of times the job has been claimed")
+    max_attempts: int = Field(description="Attempts before the job is dead-lettered")
+    last_error: Optional[str] = Field(default=None, description="Error from the most recent failed attempt")
+    lease: Optional[str] = Field(default=None, description="Token of the current claim; ack/nack/renew must present it")
+
+
+# --- TDD Anchor: test_job_queue ---
+# Test Case: Jobs are claimed in priority order, then submission order.
+# Test Case: Claimed jobs are invisible until acked, nacked or their visibility timeout expires.
+# Test Case: Expired jobs are re-delivered (crash recovery).
+# Test Case: Jobs exceeding max_attempts are dead-lettered.
+# Test Case: A re-delivered job's previous claimant can no longer ack, nack or renew it.
+# Test Case: A released job is requeued without using up an attempt.
+# --- End TDD Anchor ---
+class JobQueue:
+    """
+    Durable, SQLite-backed research job queue shared by several processes.
+
+    Claimed jobs become invisible for `visibility_timeout` seconds. A job that is not
+    acknowledged within that time (e.g. because its worker crashed) becomes visible
+    again, and after `max_attempts` claims it is moved to the dead-letter status.
+
+    Every claim hands out a new lease token per job. `ack`, `nack` and `renew` only
+    apply while the caller still holds the lease, so a worker whose job was re-delivered
+    cannot overwrite the result of (or dead-letter) the worker now running it.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 300.0, max_attempts: int = 3):
+        """Opens (and creates, if needed) the queue database at `path`."""
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        # isolation_level=None: transactions are managed explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease" not in columns: # Queue created before leases existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease TEXT")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def submit(self, query: str, priority: int = 0, max_attempts: Optional[int] = None) -> int:
+        """Adds a job to the queue and returns its id."""
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO jobs (query, priority, status, max_attempts, visible_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (query, priority, QUEUED, max_attempts or self.max_attempts, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def claim(self, batch_size: int = 1) -> List[Job]:
+        """
+        Atomically claims up to `batch_size` visible jobs, highest priority first.
+
+        Jobs whose visibility timeout expired while running are re-delivered here;
+        those that have already used all their attempts are dead-lettered instead.
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, last_error = COALESCE(last_error, 'visibility timeout expired'), updated_at = ? "
+                "WHERE status = ? AND visible_at <= ? AND attempts >= max_attempts",
+                (DEAD, now, RUNNING, now),
+            )
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND visible_at <= ? "
+                "ORDER BY priority DESC, id LIMIT ?",
+                (QUEUED, RUNNING, now, batch_size),
+            ).fetchall()
+            leases = {row["id"]: uuid.uuid4().hex for row in rows}
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, visible_at = ?, updated_at = ?, lease = ? "
+                "WHERE id = ?",
+                [(RUNNING, now + self.visibility_timeout, now, lease, job_id) for job_id, lease in leases.items()],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        return [
+            Job(
+                id=row["id"], query=row["query"], priority=row["priority"], status=RUNNING,
+                attempts=row["attempts"] + 1, max_attempts=row["max_attempts"], last_error=row["last_error"],
+                lease=leases[row["id"]],
+            )
+            for row in rows
+        ]
+
+    def renew(self, job_id: int, lease: str) -> bool:
+        """
+        Restarts the visibility timeout of a claimed job, e.g. right before running it when
+        it waited behind other jobs of its batch. Returns False if the lease was lost.
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET visible_at = ?, updated_at = ? WHERE id = ? AND lease = ? AND status = ?",
+            (now + self.visibility_timeout, now, job_id, lease, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def ack(self, job_id: int, lease: str, result: Optional[bytes] = None) -> bool:
+        """
+        Marks a claimed job as done and stores its serialized result.
+        Returns False (and changes nothing) if the lease was lost.
+        """
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, last_error = NULL, lease = NULL, updated_at = ? "
+            "WHERE id = ? AND lease = ? AND status = ?",
+            (DONE, result, time.time(), job_id, lease, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def nack(self, job_id: int, lease: str, error: str, retry_delay: float = 0.0) -> bool:
+        """
+        Records a failed attempt: requeues the job, or dead-letters it when out of attempts.
+        Returns False (and changes nothing) if the lease was lost.
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "visible_at = ?, last_error = ?, lease = NULL, updated_at = ? WHERE id = ? AND lease = ? AND status = ?",
+            (DEAD, QUEUED, now + retry_delay, error, now, job_id, lease, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: int, lease: str, reason: str, retry_delay: float = 0.0) -> bool:
+        """
+        Requeues a claimed job that could not run through no fault of its own (e.g. the batch
+        token budget ran out), giving back the attempt its claim used.
+        Returns False (and changes nothing) if the lease was lost.
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), visible_at = ?, last_error = ?, "
+            "lease = NULL, updated_at = ? WHERE id = ? AND lease = ? AND status = ?",
+            (QUEUED, now + retry_delay, reason, now, job_id, lease, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return Job(
+            id=row["id"], query=row["query"], priority=row["priority"], status=row["status"],
+            attempts=row["attempts"], max_attempts=row["max_attempts"], last_error=row["last_error"],
+        )
+
+    def result(self, job_id: int) -> Optional[bytes]:
+        """Returns the serialized result of a finished job, if any."""
+        row = self._conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["result"] if row else None
+
+    def dead_letters(self) -> List[Job]:
+        rows = self._conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY id", (DEAD,)).fetchall()
+        return [self.get(row["id"]) for row in rows]
+
+    def requeue(self, job_id: int) -> None:
+        """Moves a dead-lettered job back to the queue with a fresh attempt budget."""
+        now = time.time()
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, attempts = 0, visible_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (QUEUED, now, now, job_id, DEAD),
+        )
+
+    def counts(self) -> dict:
+        """Returns the number of jobs per status."""
+        rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
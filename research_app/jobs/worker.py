@@ -0,0 +1,237 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from typing import Optional
+
+from .store import JobQueue, Job
+from ..agents.router import ModelRouter, format_latency_summary
+from ..agents.tokens import SUMMARY_OUTPUT_TOKENS_ESTIMATE, TokenBudget
+from ..deadline import new_deadline
+from ..storage.archive import ResultsArchive, record_from_state
+from ..storage.codec import dumps_state
+
+DEFAULT_DB_PATH = "research_jobs.db"
+BATCH_BUDGET_EXHAUSTED = "Batch token budget (MAX_TOKENS_PER_BATCH) exhausted before the summary"
+
+
+# --- TDD Anchor: test_run_job ---
+# Test Case: Successful graph run acks the job with the serialized final state.
+# Test Case: Graph exception or error_message in the final state nacks the job.
+# Test Case: A job whose lease was lost while it waited in the batch is skipped.
+# Test Case: A job cut short by the exhausted batch token budget is released without using up an attempt.
+# Test Case: A job that exhausts a fresh batch budget on its own is nacked (it cannot fit any batch).
+# Test Case: Once the batch budget has no room for an LLM call, later jobs are released without running.
+# --- End TDD Anchor ---
+def run_job(graph, queue: JobQueue, job: Job, timeout_seconds: float = 0.0,
+            archive: Optional[ResultsArchive] = None, batch_budget: Optional[TokenBudget] = None) -> bool:
+    """
+    Runs one job through the compiled graph and acks or nacks it. Returns True on success.
+
+    Partial results (deadline exceeded after research) are acked; they are flagged in the stored state.
+    A job whose summary was skipped because the batch token budget ran out is released instead, so a
+    later batch, with a fresh budget, retries it without using up an attempt. If `batch_budget`
+    was still unused when the job started, no batch can fit it and it is nacked like a failure.
+    Once `batch_budget` has no room left for an LLM call, the job is released without running, so
+    the rest of a claimed batch does not spend searches on summaries it cannot afford.
+    Successful results are archived before the ack, so a crash can only duplicate a record, never lose it.
+
+    The job's visibility timeout restarts when it starts, so it covers this job only, not the
+    jobs ahead of it in the claimed batch. If the lease was already lost (the job timed out
+    and was re-delivered to another worker), the job is skipped.
+    """
+    if not queue.renew(job.id, job.lease):
+        print(f"WARNING: Job {job.id} was re-delivered to another worker before it started; skipping.")
+        return False
+
+    batch_remaining = batch_budget.remaining() if batch_budget is not None else None
+    if batch_remaining is not None and batch_remaining <= SUMMARY_OUTPUT_TOKENS_ESTIMATE:
+        # Every LLM call reserves at least this much: the summary cannot fit this batch
+        print(f"WARNING: Job {job.id}: batch token budget spent, requeueing it for a later batch without running it.")
+        if not queue.release(job.id, job.lease, BATCH_BUDGET_EXHAUSTED):
+            _warn_lost_lease(job)
+        return False
+
+    print(f"Worker: Running job {job.id} (attempt {job.attempts}/{job.max_attempts}): '{job.query}'")
+    fresh_budget = batch_budget is not None and batch_budget.used == 0
+    try:
+        final_state = graph.invoke({"query": job.query, "deadline": new_deadline(timeout_seconds)})
+    except Exception as e:
+        error_msg = f"Graph execution failed: {e}"
+        print(f"ERROR: Job {job.id} failed: {error_msg}")
+        if not queue.nack(job.id, job.lease, error_msg, retry_delay=_backoff(job.attempts)):
+            _warn_lost_lease(job)
+        return False
+
+    error_message = final_state.get("error_message") if final_state else "Graph returned no final state."
+    if error_message:
+        print(f"ERROR: Job {job.id} finished with error: {error_message}")
+        if not queue.nack(job.id, job.lease, error_message, retry_delay=_backoff(job.attempts)):
+            _warn_lost_lease(job)
+        return False
+
+    if final_state.get("budget_exhausted"):
+        error_message = BATCH_BUDGET_EXHAUSTED
+        if fresh_budget:
+            error_message += " (the job alone exceeds it)"
+            print(f"ERROR: Job {job.id}: {error_message}")
+            requeued = queue.nack(job.id, job.lease, error_message, retry_delay=_backoff(job.attempts))
+        else:
+            print(f"WARNING: Job {job.id}: {error_message}; requeueing it for a later batch.")
+            requeued = queue.release(job.id, job.lease, error_message)
+        if not requeued:
+            _warn_lost_lease(job)
+        return False
+
+    if archive is not None:
+        archive.append(record_from_state(final_state))
+    if not queue.ack(job.id, job.lease, dumps_state(final_state)):
+        _warn_lost_lease(job)
+        return False
+    print(f"Worker: Job {job.id} done.")
+    return True
+
+
+def _warn_lost_lease(job: Job) -> None:
+    print(f"WARNING: Job {job.id} outlived its visibility timeout and was re-delivered; "
+          f"this attempt's outcome was discarded.")
+
+
+def worker_loop(worker_id: int, db_path: str, batch_size: int, min_job_interval: float,
+                visibility_timeout: float, max_attempts: int, poll_interval: float,
+                exit_when_empty: bool, stop_event, archive_dir: Optional[str] = None) -> None:
+    """
+    Worker process: builds the graph once, then claims and runs jobs until stopped.
+    MAX_TOKENS_PER_BATCH applies to each claimed batch of jobs.
+    """
+    # Imported here so each worker process loads settings and builds its own warm graph
+    from ..config import app_settings
+    from ..graph.builder import build_graph
+
+    batch_budget = TokenBudget(app_settings.max_tokens_per_batch if app_settings else 0)
+    model_router = ModelRouter(app_settings) if app_settings else None
+    research_graph = build_graph(app_settings, token_budget=batch_budget, model_router=model_router)
+    if not research_graph:
+        print(f"CRITICAL ERROR: Worker {worker_id} could not build the research graph.")
+        return
+
+    queue = JobQueue(db_path, visibility_timeout=visibility_timeout, max_attempts=max_attempts)
+    archive = ResultsArchive(archive_dir) if archive_dir else None
+    print(f"Worker {worker_id}: ready (batch size {batch_size}).")
+    last_started = 0.0
+    try:
+        while not stop_event.is_set():
+            jobs = queue.claim(batch_size)
+            if not jobs:
+                if exit_when_empty:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            batch_budget.reset()
+            for job in jobs:
+                # Per-worker share of the provider rate limit
+                wait = last_started + min_job_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                last_started = time.monotonic()
+                run_job(research_graph, queue, job, timeout_seconds=app_settings.query_timeout_seconds,
+                        archive=archive, batch_budget=batch_budget)
+    finally:
+        queue.close()
+        if archive is not None:
+            archive.close()
+        for line in format_latency_summary(model_router.latency_summary()):
+            print(f"Worker {worker_id}: routing {line}")
+        print(f"Worker {worker_id}: stopped.")
+
+
+def run_workers(db_path: str, workers: int, batch_size: int = 4, rate_limit_per_minute: float = 0.0,
+                visibility_timeout: float = 300.0, max_attempts: int = 3, poll_interval: float = 1.0,
+                exit_when_empty: bool = False, archive_dir: Optional[str] = None) -> None:
+    """
+    Starts `workers` worker processes against the queue at `db_path` and waits for them.
+
+    `rate_limit_per_minute` is the total provider budget; each worker gets an equal
+    share, so throughput scales with the worker count up to that limit. If `archive_dir`
+    is set, every worker appends its results to that shared results archive.
+    """
+    # Create the schema once before the workers race to do it
+    JobQueue(db_path).close()
+
+    min_job_interval = 60.0 * workers / rate_limit_per_minute if rate_limit_per_minute > 0 else 0.0
+    stop_event = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(
+            target=worker_loop,
+            args=(i, db_path, batch_size, min_job_interval, visibility_timeout, max_attempts,
+                  poll_interval, exit_when_empty, stop_event, archive_dir),
+            name=f"research-worker-{i}",
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Started {workers} worker process(es) on '{db_path}'.")
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("Stopping workers (jobs in flight are re-delivered after their visibility timeout)...")
+        stop_event.set()
+        for process in processes:
+            process.join()
+
+
+def _backoff(attempts: int) -> float:
+    """Retry delay after a failed attempt: exponential, capped at five minutes."""
+    return min(300.0, 2.0 ** attempts)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Durable research job queue and workers.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to the SQLite queue database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit = subparsers.add_parser("submit", help="Submit a research job.")
+    submit.add_argument("query", nargs="+", help="The research query.")
+    submit.add_argument("--priority", type=int, default=0, help="Higher priorities run first.")
+    submit.add_argument("--max-attempts", type=int, default=3, help="Attempts before dead-lettering.")
+
+    work = subparsers.add_parser("work", help="Run worker processes.")
+    work.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Number of worker processes.")
+    work.add_argument("--batch-size", type=int, default=4, help="Jobs claimed per queue round trip.")
+    work.add_argument("--rate-limit", type=float, default=0.0,
+                      help="Total provider rate limit in jobs per minute across all workers (0 = unlimited).")
+    work.add_argument("--visibility-timeout", type=float, default=300.0,
+                      help="Seconds a running job stays invisible before it is re-delivered.")
+    work.add_argument("--max-attempts", type=int, default=3, help="Attempts before dead-lettering.")
+    work.add_argument("--archive", metavar="DIR", help="Append results to the results archive in DIR.")
+    work.add_argument("--exit-when-empty", action="store_true", help="Stop each worker once no job is claimable.")
+
+    subparsers.add_parser("status", help="Show job counts per status and dead-lettered jobs.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "submit":
+        queue = JobQueue(args.db, max_attempts=args.max_attempts)
+        job_id = queue.submit(" ".join(args.query), priority=args.priority)
+        queue.close()
+        print(f"Submitted job {job_id}.")
+    elif args.command == "work":
+        run_workers(
+            args.db, args.workers, batch_size=args.batch_size, rate_limit_per_minute=args.rate_limit,
+            visibility_timeout=args.visibility_timeout, max_attempts=args.max_attempts,
+            exit_when_empty=args.exit_when_empty, archive_dir=args.archive,
+        )
+    elif args.command == "status":
+        queue = JobQueue(args.db)
+        print(f"Job counts: {queue.counts()}")
+        for job in queue.dead_letters():
+            print(f"  dead job {job.id} ({job.attempts} attempts): '{job.query}' - {job.last_error}")
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
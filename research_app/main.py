@@ -1,32 +1,42 @@
 import sys
+import time
+import argparse
 import pprint # For pretty printing the final state
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
 # Import necessary components
 from .config import app_settings # Load settings first
-from .graph.builder import build_graph # Import the builder function
+from .graph.builder import build_graph, REFRESH_NEW, REFRESH_UNCHANGED # Import the builder function
 from .graph.state import AgentState # For type hinting if needed
-from .agents.schemas import SummaryResult # For type hinting
+from .agents.schemas import ResearchResult, SummaryResult, TokenUsage # For type hinting
+from .agents.researcher import snippet_fingerprint
+from .agents.batcher import SummaryBatcher
+from .agents.router import ModelRouter, format_latency_summary
+from .agents.tokens import TokenBudget
+from .deadline import new_deadline
+from .storage.archive import ResultsArchive, record_from_state
 
 # --- TDD Anchor: test_main_execution ---
 # Test Case: Provide a query, mock graph.invoke, verify expected output format (summary string or None).
 # Test Case: Simulate graph error during invoke, verify error handling in main.
 # Test Case: Test with command-line arguments.
 # Test Case: Test scenario where graph building fails (due to missing settings or build error).
+# Test Case: Run a batch file, verify each query is invoked on one graph and archived.
+# Test Case: Run a batch concurrently, verify summaries come back in query order.
+# Test Case: Refresh a query, verify the previous archived result is passed into the graph.
 # --- End TDD Anchor ---
 
-def run_application(query: str):
+def build_research_graph(node_wrapper=None, pipelined: Optional[bool] = None,
+                         summary_batcher: Optional[SummaryBatcher] = None,
+                         token_budget: Optional[TokenBudget] = None,
+                         model_router: Optional[ModelRouter] = None):
     """
-    Loads configuration, builds the graph, and runs the research/summary application.
+    Checks settings and builds the research graph. Returns the compiled graph, or None on failure.
 
-    Args:
-        query: The research topic query string.
-
-    Returns:
-        The generated summary string, or None if an error occurred.
+    `node_wrapper` (used by the profiler), `pipelined`, `summary_batcher`, `token_budget` and
+    `model_router` are passed through to `build_graph`.
     """
-    print(f"\n=== Starting Application Run ===")
-    print(f"Query: '{query}'")
-
     # 1. Check if settings loaded successfully
     if not app_settings:
         print("CRITICAL ERROR: Application settings failed to load. Check .env file and config.py.")
@@ -35,15 +45,27 @@ def run_application(query: str):
 
     # 2. Build the graph using the loaded settings
     print("Attempting to build the research graph...")
-    research_graph = build_graph(app_settings)
+    research_graph = build_graph(app_settings, node_wrapper=node_wrapper, pipelined=pipelined,
+                                 summary_batcher=summary_batcher, token_budget=token_budget,
+                                 model_router=model_router)
 
     if not research_graph:
         print("CRITICAL ERROR: Application graph could not be built. Check logs from build_graph.")
         return None
     print("Research graph built successfully.")
+    return research_graph
 
+
+def invoke_graph(research_graph, query: str, extra_input: Optional[Dict[str, Any]] = None) -> Optional[AgentState]:
+    """
+    Runs one query through the graph and prints the final state. Returns None on critical errors.
+
+    `extra_input` is merged into the initial state (e.g. the previous result in refresh mode).
+    """
     # 3. Prepare initial state and invoke the graph
-    initial_input = {"query": query}
+    # The deadline is absolute, so it covers every node and external call in the run
+    initial_input = {"query": query, "deadline": new_deadline(app_settings.query_timeout_seconds),
+                     **(extra_input or {})}
     final_state: AgentState | None = None # Initialize final_state
 
     try:
@@ -64,8 +86,11 @@ def run_application(query: str):
         else:
              print("Graph did not return a final state (likely due to critical error during invoke).")
         print("------------------------")
+    return final_state
 
 
+def process_final_state(final_state: Optional[AgentState]) -> Optional[str]:
+    """Prints the result of a run. Returns the summary string, or None if an error occurred."""
     # 4. Process the final state
     print("\n--- Application Result ---")
     if final_state:
@@ -80,8 +105,18 @@ def run_application(query: str):
                  # Decide whether to return partial summary or None based on requirements
             return None # Indicate failure due to error
         elif final_summary_obj and isinstance(final_summary_obj, SummaryResult):
+            if final_state.get("partial_result"):
+                # Its content depends on how far the run got (partial summaries, a previous summary, raw snippets)
+                print("WARNING: Deadline or token budget exceeded, this is a PARTIAL result.")
             print(f"Query: {final_summary_obj.original_query}")
             print(f"Summary:\n{final_summary_obj.summary}")
+            refresh_status = final_state.get("refresh_status")
+            if refresh_status:
+                print(f"Refresh: {refresh_status}" + (" (no new snippets, previous summary reused without an LLM call)"
+                                                      if refresh_status == REFRESH_UNCHANGED else ""))
+            token_usage = final_state.get("token_usage")
+            if token_usage:
+                print(f"Tokens: {format_token_usage(token_usage)}")
             print("------------------------")
             return final_summary_obj.summary # Return the successful summary
         else:
@@ -96,22 +131,226 @@ def run_application(query: str):
         return None
 
 
+def format_token_usage(token_usage: TokenUsage) -> str:
+    """One-line description of token usage, e.g. for the result and batch summaries."""
+    notes = [note for flag, note in ((token_usage.estimated, "estimated"),
+                                     (token_usage.truncated, "truncated to budget")) if flag]
+    return (f"{token_usage.input_tokens} in / {token_usage.output_tokens} out over {token_usage.calls} LLM call(s)"
+            + (f" ({', '.join(notes)})" if notes else ""))
+
+
+def _is_complete(record: Dict[str, Any]) -> bool:
+    return bool(record.get("summary")) and not record.get("partial_result") and not record.get("error_message")
+
+
+def refresh_input(archive: ResultsArchive, query: str) -> Dict[str, Any]:
+    """
+    Initial-state additions for refreshing `query`: the latest complete archived result, so a
+    failed or partial run does not discard it. Without one, the query is summarized from
+    scratch and marked as new.
+    """
+    record = next((record for record in archive.iter_records(query) if _is_complete(record)), None)
+    if record is None:
+        print(f"Refresh: no complete archived result for '{query}', summarizing from scratch.")
+        return {"refresh_status": REFRESH_NEW}
+    fingerprints = record.get("snippet_fingerprints")
+    if fingerprints is None: # Not a refresh run: the summary covers exactly the archived snippets
+        fingerprints = [snippet_fingerprint(snippet) for snippet in record["snippets"]]
+    return {
+        "previous_research": ResearchResult(query=record["query"], search_results=record["snippets"]),
+        "previous_summary": SummaryResult(summary=record["summary"], original_query=record["query"]),
+        "previous_fingerprints": fingerprints,
+    }
+
+
+def run_application(query: str, archive_dir: Optional[str] = None, node_wrapper=None,
+                    pipelined: Optional[bool] = None, refresh: bool = False):
+    """
+    Loads configuration, builds the graph, and runs the research/summary application.
+
+    Args:
+        query: The research topic query string.
+        archive_dir: Optional results archive directory the final state is appended to.
+        node_wrapper: Optional wrapper applied to every graph node (used by the profiler).
+        pipelined: Use the pipelined graph (default: PIPELINED_EXECUTION setting).
+        refresh: Only summarize what changed since the result archived for `query` (needs `archive_dir`).
+
+    Returns:
+        The generated summary string, or None if an error occurred.
+    """
+    print(f"\n=== Starting Application Run ===")
+    print(f"Query: '{query}'")
+
+    research_graph = build_research_graph(node_wrapper, pipelined)
+    if not research_graph:
+        return None
+
+    if not archive_dir:
+        return process_final_state(invoke_graph(research_graph, query))
+    with ResultsArchive(archive_dir) as archive:
+        final_state = invoke_graph(research_graph, query, refresh_input(archive, query) if refresh else None)
+        if final_state:
+            archive.append(record_from_state(final_state))
+    return process_final_state(final_state)
+
+
+def run_batch(queries: List[str], archive_dir: Optional[str] = None, node_wrapper=None,
+              pipelined: Optional[bool] = None, concurrency: Optional[int] = None,
+              refresh: bool = False) -> List[Optional[str]]:
+    """
+    Runs several queries through one compiled graph.
+
+    With more than one query in flight, the summarizer's LLM calls go through a SummaryBatcher:
+    prompts that would wait for a request slot are answered together in one LLM request.
+
+    Args:
+        queries: The research queries.
+        archive_dir: Optional results archive directory each final state is appended to.
+        node_wrapper: Optional wrapper applied to every graph node (used by the profiler).
+        pipelined: Use the pipelined graph (default: PIPELINED_EXECUTION setting).
+        concurrency: Queries run at the same time (default: BATCH_CONCURRENCY setting).
+        refresh: Only summarize what changed since each query's archived result (needs `archive_dir`).
+
+    Returns:
+        One summary string (or None on error) per query, in query order.
+    """
+    print(f"\n=== Starting Batch Run ({len(queries)} queries) ===")
+    if concurrency is None:
+        concurrency = app_settings.batch_concurrency if app_settings else 1
+    concurrency = max(1, min(concurrency, len(queries) or 1))
+    summary_batcher = None
+    if concurrency > 1 and app_settings:
+        summary_batcher = SummaryBatcher(
+            window_seconds=app_settings.summary_batch_window_ms / 1000,
+            max_batch_size=app_settings.summary_batch_max_size,
+            max_concurrency=app_settings.summary_batch_max_concurrency,
+        )
+    # MAX_TOKENS_PER_BATCH applies to this batch run only
+    batch_budget = TokenBudget(app_settings.max_tokens_per_batch) if app_settings else None
+    model_router = ModelRouter(app_settings) if app_settings else None # Reports this batch's LLM latency per tier
+    research_graph = build_research_graph(node_wrapper, pipelined, summary_batcher, batch_budget, model_router)
+    if not research_graph:
+        if summary_batcher:
+            summary_batcher.close()
+        return [None] * len(queries)
+
+    archive = ResultsArchive(archive_dir) if archive_dir else None
+    summaries: List[Optional[str]] = []
+    batch_tokens = TokenUsage()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-query") as executor:
+            runs = [
+                executor.submit(invoke_graph, research_graph, query,
+                                refresh_input(archive, query) if refresh and archive is not None else None)
+                for query in queries
+            ]
+            # Results are processed (and archived) in query order from this thread only
+            for number, (query, run) in enumerate(zip(queries, runs), start=1):
+                final_state = run.result()
+                print(f"\n=== Batch query {number}/{len(queries)}: '{query}' ===")
+                if final_state and archive is not None:
+                    archive.append(record_from_state(final_state))
+                if final_state and final_state.get("token_usage"):
+                    batch_tokens.add(final_state["token_usage"])
+                summaries.append(process_final_state(final_state))
+    finally:
+        if archive is not None:
+            archive.close()
+        if summary_batcher:
+            summary_batcher.close()
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for summary in summaries if summary)
+    print(f"\n=== Batch complete: {succeeded}/{len(queries)} succeeded in {elapsed:.1f}s "
+          f"({len(queries) / elapsed if elapsed else 0.0:.2f} queries/s) ===")
+    print(f"=== Batch tokens: {format_token_usage(batch_tokens)}, "
+          f"{batch_tokens.total_tokens / elapsed if elapsed else 0.0:.1f} tokens/s ===")
+    for line in format_latency_summary(model_router.latency_summary()):
+        print(f"=== Routing {line} ===")
+    if summary_batcher and summary_batcher.batches_sent:
+        print(f"=== Summary batching: {summary_batcher.prompts_sent} LLM prompts in "
+              f"{summary_batcher.batches_sent} requests ({concurrency} queries in flight) ===")
+    return summaries
+
+
+def read_batch_file(path: str) -> List[str]:
+    """Reads one query per line, skipping blank lines and '#' comments."""
+    with open(path, encoding="utf-8") as batch_file:
+        return [line.strip() for line in batch_file if line.strip() and not line.lstrip().startswith("#")]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Research a topic and summarize the results.")
+    parser.add_argument("query", nargs="*", help="The research query (ignored with --batch).")
+    parser.add_argument("--batch", metavar="FILE", help="Run every query in FILE (one per line).")
+    parser.add_argument("--concurrency", type=int, metavar="N",
+                        help="Queries run at the same time with --batch (default: BATCH_CONCURRENCY, 4).")
+    parser.add_argument("--archive", metavar="DIR", help="Append final results to the results archive in DIR.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-run tracked queries against their --archive results: skip the LLM if no "
+                             "snippet is new, otherwise update the previous summary with the new snippets only.")
+    parser.add_argument("--pipelined", action="store_true", default=None,
+                        help="Summarize result batches while later searches are still running (see RESEARCH_PAGES).")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Profile each graph node (cProfile + tracemalloc) and write reports to DIR.")
+    parser.add_argument("--profile-top", type=int, default=25, metavar="N",
+                        help="Number of allocation sites per node in the allocation report (default: 25).")
+    args = parser.parse_args(argv)
+    if args.refresh and not args.archive:
+        parser.error("--refresh requires --archive DIR (the previous results are read from it)")
+    return args
+
+
 # --- Example Usage ---
-if __name__ == "__main__":
-    # Example: Get query from command line arguments or use a default
-    if len(sys.argv) > 1:
-        user_query = " ".join(sys.argv[1:])
-    else:
-        # Default query if no arguments are provided
-        user_query = "What are the main challenges in deploying large language models?"
-        print(f"No query provided via command line, using default: '{user_query}'")
+def main(argv=None) -> int:
+    args = parse_args(argv)
 
-    # Run the application
-    summary = run_application(user_query)
+    profiler = None
+    if args.profile:
+        # Imported only when requested; helper-thread profiling is switched on by start() only
+        from .profiling import NodeProfiler
+        profiler = NodeProfiler(top_n=args.profile_top)
+        profiler.start()
+    node_wrapper = profiler.wrap if profiler else None
 
-    if summary:
-        print("\nApplication completed successfully.")
-        sys.exit(0) # Exit with success code
-    else:
-        print("\nApplication finished with errors or no result.")
-        sys.exit(1) # Exit with error code
\ No newline at end of file
+    try:
+        if args.batch:
+            batch_summaries = run_batch(read_batch_file(args.batch), archive_dir=args.archive,
+                                        node_wrapper=node_wrapper, pipelined=args.pipelined,
+                                        # cProfile attributes time per thread: profile one query at a time
+                                        concurrency=1 if profiler else args.concurrency,
+                                        refresh=args.refresh)
+            succeeded = bool(batch_summaries) and all(batch_summaries)
+            print("\nBatch completed successfully." if succeeded else "\nBatch finished with errors.")
+            return 0 if succeeded else 1
+
+        # Example: Get query from command line arguments or use a default
+        if args.query:
+            user_query = " ".join(args.query)
+        else:
+            # Default query if no arguments are provided
+            user_query = "What are the main challenges in deploying large language models?"
+            print(f"No query provided via command line, using default: '{user_query}'")
+
+        # Run the application
+        summary = run_application(user_query, archive_dir=args.archive, node_wrapper=node_wrapper,
+                                  pipelined=args.pipelined, refresh=args.refresh)
+
+        if summary:
+            print("\nApplication completed successfully.")
+            return 0 # Exit with success code
+        else:
+            print("\nApplication finished with errors or no result.")
+            return 1 # Exit with error code
+    finally:
+        if profiler:
+            profiler.stop()
+            print("\n--- Profile Summary ---")
+            print(profiler.summary())
+            for path in profiler.write_reports(args.profile):
+                print(f"Profile report written: {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
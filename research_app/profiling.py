@@ -0,0 +1,280 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import thread_hooks
+
+# Frames deeper than this are folded into their parent in the collapsed-stack output
+MAX_STACK_DEPTH = 64
+
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+# (profiler, node name) the current thread is profiling work for, if any
+_active = threading.local()
+
+
+def carry_profile(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Returns `fn` wrapped so that, run in another thread, it is profiled under the node the
+    calling thread is profiling. cProfile only sees the thread that enabled it, so helper
+    threads (deadline calls, search pages, pipeline map calls) wrap their target with
+    `thread_hooks.carry_context`, which calls this while a profiler is started.
+
+    Outside a profiled node `fn` is returned unchanged.
+    """
+    active = getattr(_active, "node", None)
+    if active is None:
+        return fn
+    profiler, name = active
+
+    def run_in_node_profile(*args, **kwargs):
+        return profiler._profile_thread(name, fn, args, kwargs)
+
+    return run_in_node_profile
+
+
+# --- TDD Anchor: test_node_profiler ---
+# Test Case: Wrapped nodes return the original node's result.
+# Test Case: Time and allocations are attributed to the node that caused them.
+# Test Case: Work a node hands to helper threads via carry_profile shows up in its profile.
+# Test Case: write_reports produces .prof, collapsed-stack, allocation and summary files.
+# --- End TDD Anchor ---
+class NodeProfiler:
+    """
+    Profiles graph nodes with cProfile and tracemalloc, attributing time and allocations per node.
+
+    Only used when profiling is requested: `build_graph` wraps nodes with `wrap` only if a
+    profiler is passed in, and helper-thread targets are only wrapped between `start` and
+    `stop`, so normal runs execute unwrapped nodes and threads.
+
+    Helper threads started through `carry_profile` get their own cProfile profiler, whose
+    stats are merged into the node's. A node's profiled time is therefore summed over its
+    threads, and includes the time the node's own thread spends waiting for them.
+    """
+
+    def __init__(self, top_n: int = 25):
+        self.top_n = top_n
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._thread_stats: Dict[str, pstats.Stats] = {} # Merged profiles of each node's helper threads
+        self._thread_lock = threading.Lock()
+        self._calls: Dict[str, int] = {}
+        self._wall_seconds: Dict[str, float] = {}
+        self._peak_bytes: Dict[str, int] = {}
+        # Per node: allocation site -> [net bytes, net blocks]
+        self._allocations: Dict[str, Dict[str, List[int]]] = {}
+        self._started_at = 0.0
+        self._total_seconds = 0.0
+        self._owns_tracemalloc = False
+
+    def start(self) -> None:
+        """Starts allocation tracing, the overall clock and profiling of helper threads."""
+        thread_hooks.set_target_hook(carry_profile)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        self._started_at = time.perf_counter()
+
+    def stop(self) -> None:
+        """Stops the overall clock, helper-thread profiling and allocation tracing (if this profiler started it)."""
+        thread_hooks.set_target_hook(None)
+        self._total_seconds = time.perf_counter() - self._started_at
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def wrap(self, name: str, node: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Returns `node` wrapped so each call is profiled under `name`."""
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+
+        def run_profiled(state):
+            tracing = tracemalloc.is_tracing()
+            before = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS) if tracing else None
+            if tracing:
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            try:
+                profile.enable()
+                enabled = True
+            except ValueError: # Another profiler is active in this thread (Python 3.12+)
+                enabled = False
+            previous, _active.node = getattr(_active, "node", None), (self, name)
+            try:
+                return node(state)
+            finally:
+                _active.node = previous
+                if enabled:
+                    profile.disable()
+                self._wall_seconds[name] = self._wall_seconds.get(name, 0.0) + time.perf_counter() - started
+                self._calls[name] = self._calls.get(name, 0) + 1
+                if tracing:
+                    self._peak_bytes[name] = max(self._peak_bytes.get(name, 0), tracemalloc.get_traced_memory()[1])
+                    after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+                    self._record_allocations(name, after.compare_to(before, "lineno"))
+
+        return run_profiled
+
+    def _profile_thread(self, name: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        """Runs `fn` in the current (helper) thread under a fresh profiler merged into `name`."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            enabled = True
+        except ValueError: # Another profiler is active in this thread (Python 3.12+)
+            enabled = False
+        previous, _active.node = getattr(_active, "node", None), (self, name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _active.node = previous
+            if enabled:
+                profile.disable()
+                try:
+                    stats = pstats.Stats(profile)
+                except TypeError: # Nothing was recorded
+                    stats = None
+                if stats is not None:
+                    with self._thread_lock:
+                        if name in self._thread_stats:
+                            self._thread_stats[name].add(stats)
+                        else:
+                            self._thread_stats[name] = stats
+
+    def _node_stats(self, name: str) -> Optional[pstats.Stats]:
+        """Stats of the node's own thread merged with those of its helper threads; None if empty."""
+        try:
+            stats = pstats.Stats(self._profiles[name])
+        except TypeError: # Profiler never enabled, so no stats were collected
+            stats = None
+        with self._thread_lock:
+            thread_stats = self._thread_stats.get(name)
+            if thread_stats is not None:
+                if stats is None:
+                    stats = pstats.Stats(thread_stats)
+                else:
+                    stats.add(thread_stats)
+        return stats
+
+    def _record_allocations(self, name: str, differences: List[tracemalloc.StatisticDiff]) -> None:
+        sites = self._allocations.setdefault(name, {})
+        for difference in differences:
+            if not difference.size_diff and not difference.count_diff:
+                continue
+            frame = difference.traceback[0]
+            totals = sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+            totals[0] += difference.size_diff
+            totals[1] += difference.count_diff
+
+    # --- Reports ---
+
+    def write_reports(self, output_dir: str) -> List[str]:
+        """Writes per-node .prof files, a collapsed-stack file, an allocation report and a summary."""
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+
+        collapsed_lines: List[str] = []
+        for name in self._profiles:
+            if not self._calls.get(name):
+                continue
+            stats = self._node_stats(name)
+            if stats is None:
+                continue
+            prof_path = os.path.join(output_dir, f"{name}.prof")
+            stats.dump_stats(prof_path)
+            written.append(prof_path)
+            collapsed_lines.extend(collapse_stacks(stats, prefix=name))
+
+        collapsed_path = os.path.join(output_dir, "profile.collapsed")
+        with open(collapsed_path, "w", encoding="utf-8") as collapsed:
+            collapsed.write("\n".join(collapsed_lines) + ("\n" if collapsed_lines else ""))
+        written.append(collapsed_path)
+
+        allocations_path = os.path.join(output_dir, "allocations.txt")
+        with open(allocations_path, "w", encoding="utf-8") as report:
+            report.write(self.allocation_report())
+        written.append(allocations_path)
+
+        summary_path = os.path.join(output_dir, "summary.txt")
+        with open(summary_path, "w", encoding="utf-8") as summary:
+            summary.write(self.summary())
+        written.append(summary_path)
+        return written
+
+    def allocation_report(self) -> str:
+        """Top-N allocation sites (net bytes still allocated after the node returned) per node."""
+        lines = []
+        for name, sites in self._allocations.items():
+            lines.append(f"=== {name}: top {self.top_n} allocation sites (net) ===")
+            ranked = sorted(sites.items(), key=lambda item: abs(item[1][0]), reverse=True)[:self.top_n]
+            for site, (size, count) in ranked:
+                lines.append(f"{size / 1024:>12.1f} KiB {count:>9} blocks  {site}")
+            lines.append("")
+        return "\n".join(lines) if lines else "No allocations recorded (tracemalloc was not running).\n"
+
+    def summary(self) -> str:
+        """Per-node calls, wall time, time inside profiled Python functions and peak traced memory."""
+        lines = [f"{'node':<14}{'calls':>7}{'wall s':>10}{'profiled s':>12}{'peak MiB':>10}"]
+        node_total = 0.0
+        for name, calls in self._calls.items():
+            wall = self._wall_seconds.get(name, 0.0)
+            node_total += wall
+            stats = self._node_stats(name)
+            profiled = stats.total_tt if stats is not None else 0.0
+            peak = self._peak_bytes.get(name, 0) / (1024 * 1024)
+            lines.append(f"{name:<14}{calls:>7}{wall:>10.3f}{profiled:>12.3f}{peak:>10.2f}")
+        if self._total_seconds:
+            lines.append(f"{'outside nodes':<14}{'':>7}{max(0.0, self._total_seconds - node_total):>10.3f}"
+                         "   (graph build, LangGraph overhead, output)")
+        return "\n".join(lines) + "\n"
+
+
+def collapse_stacks(stats: pstats.Stats, prefix: str) -> List[str]:
+    """
+    Converts cProfile stats into collapsed stacks ("a;b;c <microseconds>") for flame graph tools.
+
+    cProfile only records caller/callee pairs, so a callee's time is split across the
+    paths leading to it in proportion to each caller's share.
+    """
+    raw: Dict[Tuple, Tuple] = stats.stats # type: ignore[attr-defined]
+    callees: Dict[Tuple, Dict[Tuple, float]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3] # Cumulative time via this edge
+    roots = [func for func, (_, _, _, _, callers) in raw.items() if not any(c in raw for c in callers)]
+
+    totals: Dict[str, float] = {}
+
+    def walk(func: Tuple, path: List[str], on_path: set, scale: float) -> None:
+        _, _, own_time, cumulative, _ = raw[func]
+        frames = path + [_frame_label(func)]
+        key = ";".join(frames)
+        totals[key] = totals.get(key, 0.0) + own_time * scale
+        if len(frames) >= MAX_STACK_DEPTH:
+            totals[key] += (cumulative - own_time) * scale
+            return
+        for child, edge_cumulative in callees.get(func, {}).items():
+            child_cumulative = raw[child][3]
+            # Skip cycles, and prune paths worth less than a microsecond to keep the walk bounded
+            if child in on_path or child_cumulative <= 0 or scale * edge_cumulative < 1e-6:
+                continue
+            walk(child, frames, on_path | {child}, scale * edge_cumulative / child_cumulative)
+
+    for root in roots:
+        walk(root, [prefix], {root}, 1.0)
+    return [f"{stack} {int(seconds * 1_000_000)}" for stack, seconds in totals.items() if seconds * 1_000_000 >= 1]
+
+
+def _frame_label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~": # Built-in functions
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
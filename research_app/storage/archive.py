@@ -0,0 +1,393 @@
+import contextlib
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from . import codec
+
+try:
+    import fcntl # POSIX only: lets several processes append to one archive
+except ImportError: # pragma: no cover - Windows
+    fcntl = None
+
+# Segment frame: payload length, then the zlib-compressed record (see codec.py)
+FRAME_HEADER = struct.Struct("<I")
+# Index entry: query hash, segment id, frame offset, payload length
+INDEX_ENTRY = struct.Struct("<QIQI")
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".seg"
+SORTED_INDEX = "index.sorted"
+INDEX_LOG = "index.log"
+LOCK_FILE = "archive.lock"
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for lookups: collapsed whitespace, case-folded."""
+    return " ".join(query.split()).casefold()
+
+
+def query_hash(query: str) -> int:
+    """64-bit hash of the normalized query, used as the index key."""
+    digest = hashlib.blake2b(normalize_query(query).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def record_from_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds an archive record (query, snippets, summary, timings, token usage) from a final graph state.
+    Refresh runs also store the fingerprints of every snippet the summary covers, accumulated over runs.
+    """
+    research_info = state.get("research_info")
+    final_summary = state.get("final_summary")
+    routing_decision = state.get("routing_decision")
+    token_usage = state.get("token_usage")
+    return {
+        "query": state.get("query") or (research_info.query if research_info else ""),
+        "snippets": list(research_info.search_results) if research_info else [],
+        "summary": final_summary.summary if final_summary else None,
+        "partial_result": bool(state.get("partial_result", False)),
+        "error_message": state.get("error_message"),
+        "timings": dict(state.get("timings") or {}),
+        "routing_decision": routing_decision.model_dump() if isinstance(routing_decision, BaseModel) else None,
+        "token_usage": token_usage.model_dump() if isinstance(token_usage, BaseModel) else None,
+        "refresh_status": state.get("refresh_status"),
+        "snippet_fingerprints": state.get("snippet_fingerprints"),
+        "archived_at": time.time(),
+    }
+
+
+# --- TDD Anchor: test_results_archive ---
+# Test Case: Appended records can be looked up by (normalized) query; the latest record wins.
+# Test Case: iter_records() yields every record for a query, newest first.
+# Test Case: Lookups work both before and after the index log is compacted.
+# Test Case: scan() streams every record across rotated segments in append order.
+# Test Case: A reopened archive finds records written by an earlier instance.
+# Test Case: Appends after a writer was killed mid-frame leave the archive scannable.
+# --- End TDD Anchor ---
+class ResultsArchive:
+    """
+    Append-only, compressed archive of research results.
+
+    Records are zlib-compressed codec frames appended to numbered segment files. Every
+    append also writes a fixed-size entry (query hash, segment, offset, length) to
+    `index.log`; compaction merges the log into `index.sorted`, which is memory-mapped
+    and binary-searched for point lookups. Appends take an exclusive file lock, so batch
+    runs and worker processes can write to the same archive directory. A writer killed
+    mid-append leaves unindexed bytes behind; the next append cuts them off first.
+
+    Each instance keeps the index log parsed in memory (by query hash) and only reads the
+    entries appended since its last lookup, so lookups stay fast however long the log grows.
+    """
+
+    def __init__(self, path: str, segment_max_bytes: int = 64 * 1024 * 1024, compact_threshold: int = 100_000):
+        """Opens (and creates, if needed) the archive directory at `path`."""
+        self.path = path
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_threshold = compact_threshold # Index log entries that trigger compaction
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = open(os.path.join(path, LOCK_FILE), "a+b")
+        self._index_map: Optional[mmap.mmap] = None
+        self._index_key: Optional[Tuple[int, int, int]] = None
+        # Parsed index log: query hash -> (segment, offset, length) entries, oldest first
+        self._log_entries: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._log_offset = 0 # Bytes of index.log parsed into _log_entries
+        self._log_index_key: Optional[Tuple[int, int, int]] = None # Sorted index the log was read against
+
+    def close(self) -> None:
+        self._close_index_map()
+        self._lock_file.close()
+
+    def __enter__(self) -> "ResultsArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # --- Writing ---
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Appends one record (must contain a 'query' key)."""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Appends several records under a single lock acquisition."""
+        frames = []
+        for record in records:
+            payload = zlib.compress(codec.dumps(record))
+            frames.append((query_hash(record["query"]), payload))
+        if not frames:
+            return
+
+        with self._locked():
+            self._truncate_torn_writes()
+            segment_id = self._active_segment_id()
+            entries = []
+            segment = open(self._segment_path(segment_id), "ab")
+            try:
+                for key, payload in frames:
+                    if segment.tell() >= self.segment_max_bytes:
+                        segment.close()
+                        segment_id += 1
+                        segment = open(self._segment_path(segment_id), "ab")
+                    offset = segment.tell()
+                    segment.write(FRAME_HEADER.pack(len(payload)))
+                    segment.write(payload)
+                    entries.append(INDEX_ENTRY.pack(key, segment_id, offset, len(payload)))
+            finally:
+                segment.close()
+
+            # Index entries are written after their records, so every indexed record is complete
+            with open(os.path.join(self.path, INDEX_LOG), "ab") as log:
+                log.write(b"".join(entries))
+                log_entries = log.tell() // INDEX_ENTRY.size
+            if log_entries >= self.compact_threshold:
+                self._compact_locked()
+
+    def compact_index(self) -> None:
+        """Merges the index log into the sorted, memory-mapped index."""
+        with self._locked():
+            self._compact_locked()
+
+    # --- Reading ---
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Returns the most recently archived record for `query`, or None."""
+        return next(self.iter_records(query), None)
+
+    def iter_records(self, query: str) -> Iterator[Dict[str, Any]]:
+        """Streams every archived record for `query`, newest first, reading each only when needed."""
+        key = query_hash(query)
+        normalized = normalize_query(query)
+        for segment_id, offset, length in self._candidates(key):
+            record = self._read_record(segment_id, offset, length)
+            if normalize_query(record.get("query", "")) == normalized: # Guard against hash collisions
+                yield record
+
+    def scan(self) -> Iterator[Dict[str, Any]]:
+        """Streams every record in append order, one segment at a time."""
+        for segment_id in self._segment_ids():
+            with open(self._segment_path(segment_id), "rb") as segment:
+                while True:
+                    header = segment.read(FRAME_HEADER.size)
+                    if len(header) < FRAME_HEADER.size:
+                        break
+                    (length,) = FRAME_HEADER.unpack(header)
+                    payload = segment.read(length)
+                    if len(payload) < length: # Torn write at the end of the segment
+                        break
+                    yield codec.loads(zlib.decompress(payload))
+
+    def __len__(self) -> int:
+        """Number of indexed records (including superseded ones)."""
+        total = 0
+        for name in (SORTED_INDEX, INDEX_LOG):
+            with contextlib.suppress(FileNotFoundError):
+                total += os.path.getsize(os.path.join(self.path, name)) // INDEX_ENTRY.size
+        return total
+
+    # --- Internals ---
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.path, f"{SEGMENT_PREFIX}{segment_id:06d}{SEGMENT_SUFFIX}")
+
+    def _segment_ids(self) -> List[int]:
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.path)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _active_segment_id(self) -> int:
+        segment_ids = self._segment_ids()
+        if not segment_ids:
+            return 0
+        latest = segment_ids[-1]
+        if os.path.getsize(self._segment_path(latest)) >= self.segment_max_bytes:
+            return latest + 1
+        return latest
+
+    def _truncate_torn_writes(self) -> None:
+        """
+        Cuts off what a writer killed mid-append left behind (lock held): a partial index log
+        entry, and any bytes of the latest segment after its last indexed frame. Otherwise the
+        next frame would follow a torn one and `scan` could not read past it.
+        """
+        log_path = os.path.join(self.path, INDEX_LOG)
+        with contextlib.suppress(FileNotFoundError):
+            log_size = os.path.getsize(log_path)
+            if log_size % INDEX_ENTRY.size:
+                os.truncate(log_path, log_size - log_size % INDEX_ENTRY.size)
+        segment_ids = self._segment_ids()
+        if not segment_ids:
+            return
+        latest = segment_ids[-1]
+        last = self._last_indexed_frame()
+        if last is not None and last[0] > latest:
+            return # Should not happen; never cut indexed data
+        # Index entries are written after their frames: nothing past the last indexed frame is complete
+        end = last[1] + FRAME_HEADER.size + last[2] if last is not None and last[0] == latest else 0
+        segment_path = self._segment_path(latest)
+        if os.path.getsize(segment_path) > end:
+            print(f"Results Archive: truncating an interrupted append in '{segment_path}' to {end} bytes.")
+            os.truncate(segment_path, end)
+
+    def _last_indexed_frame(self) -> Optional[Tuple[int, int, int]]:
+        """(segment, offset, length) of the most recently appended frame that was indexed, or None."""
+        with contextlib.suppress(FileNotFoundError):
+            with open(os.path.join(self.path, INDEX_LOG), "rb") as log:
+                log_size = os.fstat(log.fileno()).st_size
+                if log_size >= INDEX_ENTRY.size:
+                    # Appends are serialized, so the log's last entry is the newest frame
+                    log.seek(log_size - log_size % INDEX_ENTRY.size - INDEX_ENTRY.size)
+                    _, segment_id, offset, length = INDEX_ENTRY.unpack(log.read(INDEX_ENTRY.size))
+                    return segment_id, offset, length
+        index_map = self._sorted_index() # Just compacted: the sorted index is ordered by key, not position
+        if index_map is None:
+            return None
+        return max(((segment_id, offset, length) for _, segment_id, offset, length in INDEX_ENTRY.iter_unpack(index_map)),
+                   default=None)
+
+    def _read_record(self, segment_id: int, offset: int, length: int) -> Dict[str, Any]:
+        with open(self._segment_path(segment_id), "rb") as segment:
+            segment.seek(offset + FRAME_HEADER.size)
+            return codec.loads(zlib.decompress(segment.read(length)))
+
+    def _read_log(self) -> List[Tuple[int, int, int, int]]:
+        try:
+            with open(os.path.join(self.path, INDEX_LOG), "rb") as log:
+                data = log.read()
+        except FileNotFoundError:
+            return []
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+    def _log_entries_for(self, key: int) -> List[Tuple[int, int, int]]:
+        """Index log entries for `key`, after parsing the entries appended since the last call."""
+        for _ in range(3):
+            index_key = self._index_identity()
+            if index_key != self._log_index_key: # Compacted: the log was merged and truncated
+                self._reset_log_entries(index_key)
+            self._read_new_log_entries()
+            if self._index_identity() == index_key:
+                break
+            # Compacted while reading: the parsed entries may mix the old and the new log
+        return self._log_entries.get(key, [])
+
+    def _read_new_log_entries(self) -> None:
+        try:
+            with open(os.path.join(self.path, INDEX_LOG), "rb") as log:
+                if os.fstat(log.fileno()).st_size < self._log_offset: # Truncated by a compaction
+                    self._reset_log_entries(self._log_index_key)
+                log.seek(self._log_offset)
+                data = log.read()
+        except FileNotFoundError:
+            self._reset_log_entries(self._log_index_key)
+            return
+        usable = len(data) - len(data) % INDEX_ENTRY.size # A torn entry is read again next time
+        for entry_key, segment_id, offset, length in INDEX_ENTRY.iter_unpack(data[:usable]):
+            self._log_entries.setdefault(entry_key, []).append((segment_id, offset, length))
+        self._log_offset += usable
+
+    def _reset_log_entries(self, index_key: Optional[Tuple[int, int, int]]) -> None:
+        self._log_entries = {}
+        self._log_offset = 0
+        self._log_index_key = index_key
+
+    def _candidates(self, key: int) -> Iterator[Tuple[int, int, int]]:
+        """Yields (segment, offset, length) for `key`, newest first: index log, then sorted index."""
+        yield from reversed(self._log_entries_for(key))
+
+        index_map = self._sorted_index()
+        if index_map is None:
+            return
+        # Sorted by (key, segment, offset), so the last entry with this key is the newest
+        position = self._upper_bound(index_map, key) - 1
+        while position >= 0:
+            entry_key, segment_id, offset, length = INDEX_ENTRY.unpack_from(index_map, position * INDEX_ENTRY.size)
+            if entry_key != key:
+                break
+            yield segment_id, offset, length
+            position -= 1
+
+    @staticmethod
+    def _upper_bound(index_map: mmap.mmap, key: int) -> int:
+        """Index of the first entry whose key is greater than `key`."""
+        low, high = 0, len(index_map) // INDEX_ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            (middle_key,) = struct.unpack_from("<Q", index_map, middle * INDEX_ENTRY.size)
+            if middle_key <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _index_identity(self) -> Optional[Tuple[int, int, int]]:
+        """(inode, size, mtime) of the sorted index, which every compaction replaces; None if absent."""
+        try:
+            stat = os.stat(os.path.join(self.path, SORTED_INDEX))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _sorted_index(self) -> Optional[mmap.mmap]:
+        """Returns the memory-mapped sorted index, re-mapping it if compaction replaced the file."""
+        index_path = os.path.join(self.path, SORTED_INDEX)
+        index_key = self._index_identity()
+        if index_key is None:
+            self._close_index_map()
+            return None
+        if index_key != self._index_key:
+            self._close_index_map()
+            if index_key[1] == 0:
+                return None
+            with open(index_path, "rb") as index_file:
+                self._index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_key = index_key
+        return self._index_map
+
+    def _close_index_map(self) -> None:
+        if self._index_map is not None:
+            self._index_map.close()
+        self._index_map = None
+        self._index_key = None
+
+    def _compact_locked(self) -> None:
+        """Streams a merge of the sorted index and the (sorted) index log into a new sorted index."""
+        log_entries = sorted(self._read_log())
+        if not log_entries:
+            return
+        index_path = os.path.join(self.path, SORTED_INDEX)
+        temp_path = index_path + ".tmp"
+        index_map = self._sorted_index()
+        existing = INDEX_ENTRY.iter_unpack(index_map) if index_map is not None else iter(())
+        with open(temp_path, "wb") as temp:
+            for entry in heapq.merge(existing, log_entries):
+                temp.write(INDEX_ENTRY.pack(*entry))
+            temp.flush()
+            os.fsync(temp.fileno())
+        self._close_index_map()
+        os.replace(temp_path, index_path)
+        # A crash before this truncation only leaves duplicate entries, which lookups tolerate
+        with open(os.path.join(self.path, INDEX_LOG), "wb"):
+            pass
+        print(f"Results Archive: compacted {len(log_entries)} index entries into '{index_path}'.")
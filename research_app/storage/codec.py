@@ -0,0 +1,143 @@
+"""
+Serialization codec for AgentState and the agent schemas.
+
+Everything that crosses a process or disk boundary (job queue results, archive records)
+goes through this module. Payloads are compact JSON (orjson when installed, the standard
+library otherwise) behind a small header:
+
+    b"RAC" + one version byte + JSON
+
+Decoding always rebuilds Pydantic models with `model_validate`: fields with defaults may be
+missing and unknown keys are ignored, but a missing required field or a wrongly typed value
+raises. `strict=True` also rejects unknown keys.
+"""
+import json
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic import BaseModel
+
+from ..agents.schemas import ResearchResult, RoutingDecision, SummaryResult, TokenUsage
+
+try:
+    import orjson
+except ImportError: # pragma: no cover - orjson is optional
+    orjson = None
+
+MAGIC = b"RAC"
+CODEC_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 1
+
+# Model type of each AgentState key holding a Pydantic model; other keys are plain JSON values
+STATE_MODELS: Dict[str, Type[BaseModel]] = {
+    "research_info": ResearchResult,
+    "previous_research": ResearchResult,
+    "final_summary": SummaryResult,
+    "previous_summary": SummaryResult,
+    "routing_decision": RoutingDecision,
+    "token_usage": TokenUsage,
+}
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+_FIELD_NAMES: Dict[Type[BaseModel], frozenset] = {} # Cached: model_fields is comparatively slow to access
+# Schemas whose __dict__ holds exactly their JSON-compatible field values (no nested models)
+_FLAT_MODELS = frozenset(STATE_MODELS.values())
+
+
+class CodecError(ValueError):
+    """Raised for truncated payloads, payloads written by a newer codec version and (strict) unknown fields."""
+
+
+def dumps(value: Any) -> bytes:
+    """Encodes a JSON-compatible value (Pydantic models are dumped to dicts)."""
+    return _header() + _dump_json(value)
+
+
+def loads(data: bytes) -> Any:
+    """
+    Decodes a value written by `dumps`. Models come back as plain dicts.
+
+    Payloads without the codec header are read as plain JSON, so data written before the
+    codec existed stays readable.
+    """
+    return _load_json(_payload(data))
+
+
+def dumps_model(model: BaseModel) -> bytes:
+    """Encodes one Pydantic model."""
+    return dumps(model)
+
+
+def loads_model(data: bytes, model_type: Type[ModelT], strict: bool = False) -> ModelT:
+    """Decodes and validates a model written by `dumps_model`; `strict=True` also rejects unknown keys."""
+    return _build(model_type, loads(data), strict)
+
+
+def dumps_state(state: Dict[str, Any]) -> bytes:
+    """Encodes an AgentState (or any dict whose model-valued keys are listed in STATE_MODELS)."""
+    return dumps(state)
+
+
+def loads_state(data: bytes, strict: bool = False) -> Dict[str, Any]:
+    """
+    Decodes a state written by `dumps_state`, rebuilding and validating its Pydantic models;
+    `strict=True` also rejects unknown keys in them.
+    """
+    state = loads(data)
+    if not isinstance(state, dict):
+        raise CodecError(f"Expected an encoded state (dict), got {type(state).__name__}")
+    for key, model_type in STATE_MODELS.items():
+        if isinstance(state.get(key), dict):
+            state[key] = _build(model_type, state[key], strict)
+    return state
+
+
+def _build(model_type: Type[ModelT], fields: Any, strict: bool) -> ModelT:
+    if strict and isinstance(fields, dict):
+        unknown = fields.keys() - _field_names(model_type)
+        if unknown:
+            raise CodecError(f"Unknown {model_type.__name__} fields: {', '.join(sorted(unknown))}")
+    return model_type.model_validate(fields)
+
+
+def _field_names(model_type: Type[BaseModel]) -> frozenset:
+    names = _FIELD_NAMES.get(model_type)
+    if names is None:
+        names = _FIELD_NAMES[model_type] = frozenset(model_type.model_fields)
+    return names
+
+
+def _header() -> bytes:
+    return MAGIC + bytes((CODEC_VERSION,))
+
+
+def _payload(data: bytes) -> bytes:
+    if not data.startswith(MAGIC):
+        return data # Plain JSON written before the codec existed
+    if len(data) < HEADER_SIZE:
+        raise CodecError("Truncated codec header")
+    version = data[len(MAGIC)]
+    if version > CODEC_VERSION:
+        raise CodecError(f"Payload written by codec version {version}; this version reads up to {CODEC_VERSION}")
+    return data[HEADER_SIZE:]
+
+
+def _default(value: Any) -> Any:
+    if type(value) in _FLAT_MODELS:
+        return value.__dict__ # Same content as model_dump(), without copying
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+if orjson is not None:
+    def _dump_json(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def _load_json(payload: bytes) -> Any:
+        return orjson.loads(payload)
+else: # pragma: no cover - exercised only without orjson
+    def _dump_json(value: Any) -> bytes:
+        return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+    def _load_json(payload: bytes) -> Any:
+        return json.loads(payload)
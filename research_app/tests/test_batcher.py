@@ -0,0 +1,242 @@
+import re
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.agents.batcher import SummaryBatcher
+from research_app.agents.summarizer import SummarizerAgent
+from research_app.agents.schemas import BulkSummaryResult, ResearchResult, SummaryResult, TokenUsage
+from research_app.deadline import DeadlineExceeded
+
+# --- Test Fixtures ---
+
+def echo(prompt):
+    if "bad" in prompt:
+        raise ValueError(f"cannot summarize {prompt!r}")
+    return f"summary of {prompt}"
+
+class FakeBulkSender:
+    """Fake bulk request: answers each prompt with `respond` and records the size of every request."""
+
+    def __init__(self, respond=echo):
+        self.respond = respond
+        self.batch_sizes = []
+
+    def __call__(self, prompts):
+        self.batch_sizes.append(len(prompts))
+        results = []
+        for prompt in prompts:
+            try:
+                results.append(self.respond(prompt))
+            except Exception as e:
+                results.append(e)
+        return results
+
+def bulk_response(answers, input_tokens, output_tokens):
+    """
+    Mimics `with_structured_output(BulkSummaryResult, include_raw=True).invoke` output.
+    `answers` holds (summary, original_query) pairs.
+    """
+    return {
+        "raw": MagicMock(usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens}),
+        "parsed": BulkSummaryResult(summaries=[SummaryResult(summary=summary, original_query=query)
+                                               for summary, query in answers]),
+        "parsing_error": None,
+    }
+
+def task_queries(bulk_prompt):
+    """Queries of the bulk prompt's tasks, in `=== TASK n ===` order."""
+    sections = re.split(r"=== TASK \d+ ===", bulk_prompt)[1:]
+    return [re.search(r"^Query: (.*)$", section, re.MULTILINE).group(1) for section in sections]
+
+def make_agent(mock_chat_google):
+    """Agent whose fast and large model are the same mocked LLM."""
+    llm = MagicMock()
+    mock_chat_google.return_value = llm
+    settings = AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key",
+                           google_llm_model_name="large-model", google_llm_fast_model_name="large-model")
+    return SummarizerAgent(settings=settings), llm
+
+@pytest.fixture
+def batcher():
+    """Batcher with one request slot and a window long enough for concurrent test submissions to land in it."""
+    summary_batcher = SummaryBatcher(window_seconds=0.2, max_batch_size=8, max_concurrency=1)
+    yield summary_batcher
+    summary_batcher.close()
+
+# --- Test Cases for SummaryBatcher ---
+
+# TDD Anchor: test_summary_batcher (from batcher.py)
+def test_prompts_within_window_are_sent_in_one_batch(batcher):
+    model = FakeBulkSender()
+    futures = [batcher.submit("model", model, f"prompt {i}") for i in range(5)]
+
+    assert [future.result(timeout=2) for future in futures] == [f"summary of prompt {i}" for i in range(5)]
+    assert model.batch_sizes == [5]
+
+def test_full_batch_is_sent_without_waiting_for_window():
+    model = FakeBulkSender()
+    with SummaryBatcher(window_seconds=10.0, max_batch_size=3, max_concurrency=1) as batcher:
+        started = time.monotonic()
+        futures = [batcher.submit("model", model, f"prompt {i}") for i in range(3)]
+        assert [future.result(timeout=2) for future in futures] == [f"summary of prompt {i}" for i in range(3)]
+        assert time.monotonic() - started < 5.0
+    assert model.batch_sizes == [3]
+
+def test_models_are_batched_separately_and_failures_stay_isolated(batcher):
+    fast, large = FakeBulkSender(), FakeBulkSender()
+    good = batcher.submit("fast", fast, "good")
+    bad = batcher.submit("fast", fast, "bad")
+    other = batcher.submit("large", large, "other")
+
+    assert good.result(timeout=2) == "summary of good"
+    with pytest.raises(ValueError, match="cannot summarize"):
+        bad.result(timeout=2)
+    assert other.result(timeout=2) == "summary of other"
+    assert (fast.batch_sizes, large.batch_sizes) == ([2], [1])
+
+def test_prompts_are_spread_over_free_request_slots():
+    model = FakeBulkSender()
+    with SummaryBatcher(window_seconds=0.2, max_batch_size=8, max_concurrency=4) as batcher:
+        futures = [batcher.submit("model", model, f"prompt {i}") for i in range(8)]
+        assert [future.result(timeout=2) for future in futures] == [f"summary of prompt {i}" for i in range(8)]
+    assert model.batch_sizes == [2, 2, 2, 2] # Bundled only as far as the free slots require
+
+def test_prompts_arriving_while_every_slot_is_busy_are_sent_together():
+    release = threading.Event()
+    model = FakeBulkSender(lambda prompt: release.wait(5) and f"summary of {prompt}")
+    with SummaryBatcher(window_seconds=0.0, max_concurrency=1) as batcher:
+        first = batcher.submit("model", model, "first")
+        while not model.batch_sizes: # Sent at once: a slot was free
+            time.sleep(0.01)
+        later = [batcher.submit("model", model, f"later {i}") for i in range(3)]
+        release.set()
+        assert first.result(timeout=2) == "summary of first"
+        assert [future.result(timeout=2) for future in later] == [f"summary of later {i}" for i in range(3)]
+    assert model.batch_sizes == [1, 3]
+
+def test_failed_bulk_request_fails_every_prompt_in_it(batcher):
+    def unavailable(prompts):
+        raise ConnectionError("LLM unavailable")
+
+    futures = [batcher.submit("model", unavailable, f"prompt {i}") for i in range(2)]
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(timeout=2)
+
+def test_close_flushes_pending_prompts():
+    model = FakeBulkSender()
+    batcher = SummaryBatcher(window_seconds=10.0)
+    future = batcher.submit("model", model, "prompt")
+    batcher.close()
+    assert future.result(timeout=0) == "summary of prompt"
+    with pytest.raises(RuntimeError):
+        batcher.submit("model", model, "late")
+
+def test_max_concurrency_caps_bulk_requests_in_flight():
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def slow(prompt):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return prompt
+
+    models = [FakeBulkSender(slow) for _ in range(4)]
+    with SummaryBatcher(window_seconds=0.01, max_batch_size=4, max_concurrency=2) as batcher:
+        futures = [batcher.submit(f"model {i}", model, f"prompt {j}") for i, model in enumerate(models) for j in range(4)]
+        assert all(future.result(timeout=5) for future in futures)
+
+    assert peak[0] == 2 # Not max_concurrency per batch times concurrent batches
+
+def test_cancelled_prompts_are_not_sent():
+    model = FakeBulkSender()
+    with SummaryBatcher(window_seconds=0.2) as batcher:
+        kept = batcher.submit("model", model, "kept")
+        dropped = batcher.submit("model", model, "dropped")
+        assert dropped.cancel()
+        assert kept.result(timeout=2) == "summary of kept"
+    assert model.batch_sizes == [1]
+
+# --- Test Cases for batching inside SummarizerAgent ---
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_concurrent_summaries_share_one_bulk_request(mock_chat_google, batcher):
+    agent, llm = make_agent(mock_chat_google)
+    queries = [f"query {i}" for i in range(4)]
+    bulk_llm = llm.with_structured_output.return_value
+    # Answers each task, in prompt order, with its query, so the test can check demultiplexing
+    bulk_llm.invoke.side_effect = lambda prompt: bulk_response(
+        [(query, query) for query in task_queries(prompt)], 400, 40)
+    agent.batcher = batcher
+    usages = [TokenUsage() for _ in queries]
+
+    def summarize(index):
+        research = ResearchResult(query=queries[index], search_results=["a"], raw_content="a")
+        return agent.run(research, usage=usages[index]).summary
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        summaries = list(executor.map(summarize, range(4)))
+
+    assert summaries == queries # Each run got its own result back
+    assert bulk_llm.invoke.call_count == 1 # One LLM request for all four prompts
+    llm.with_structured_output.assert_called_with(BulkSummaryResult, include_raw=True)
+    assert "=== TASK 4 ===" in bulk_llm.invoke.call_args[0][0]
+    assert sum(usage.input_tokens for usage in usages) == 400 # The request's usage is split over the queries
+    assert sum(usage.output_tokens for usage in usages) == 40
+    assert all(usage.calls == 1 and usage.estimated for usage in usages)
+    assert (batcher.batches_sent, batcher.prompts_sent) == (1, 4)
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_bulk_request_with_missing_answers_fails_every_prompt(mock_chat_google):
+    agent, llm = make_agent(mock_chat_google)
+    llm.with_structured_output.return_value.invoke.return_value = bulk_response([("only one", "q1")], 100, 10)
+
+    with pytest.raises(ValueError, match="answered 1 of 2"):
+        agent._invoke_bulk(llm, "large-model", [("q1", "prompt 1"), ("q2", "prompt 2")])
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_bulk_answers_out_of_order_are_not_handed_to_the_wrong_query(mock_chat_google):
+    agent, llm = make_agent(mock_chat_google)
+    bulk_llm, single_llm = MagicMock(), MagicMock()
+    llm.with_structured_output.side_effect = lambda schema, include_raw: (
+        bulk_llm if schema is BulkSummaryResult else single_llm)
+    # The bulk reply answers the tasks in reverse order
+    bulk_llm.invoke.side_effect = lambda prompt: bulk_response(
+        [(f"summary of {query}", query) for query in reversed(task_queries(prompt))], 200, 20)
+    single_llm.invoke.side_effect = lambda prompt: {
+        "raw": MagicMock(usage_metadata={"input_tokens": 50, "output_tokens": 5}),
+        "parsed": SummaryResult(summary=f"resent {prompt}", original_query=""),
+        "parsing_error": None,
+    }
+    tasks = [("q1", "prompt 1"), ("q2", "prompt 2"), ("q3", "prompt 3")]
+
+    results = agent._invoke_bulk(llm, "large-model", tasks)
+
+    # The middle task got its own answer; the others were sent again on their own
+    assert [summary_result.summary for summary_result, _ in results] == [
+        "resent prompt 1", "summary of q2", "resent prompt 3"]
+    assert [call.args[0] for call in single_llm.invoke.call_args_list] == ["prompt 1", "prompt 3"]
+    # Resent tasks are charged their share of the bulk request plus their own request
+    assert sum(usage.input_tokens for _, usage in results) == 200 + 2 * 50
+    assert [usage.calls for _, usage in results] == [2, 1, 2]
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_prompt_is_withdrawn_when_its_deadline_passes_before_sending(mock_chat_google):
+    agent, llm = make_agent(mock_chat_google)
+
+    with SummaryBatcher(window_seconds=0.5) as batcher: # The window outlasts the deadline
+        agent.batcher = batcher
+        research = ResearchResult(query="q", search_results=["a"], raw_content="a")
+        with pytest.raises(DeadlineExceeded):
+            agent.run(research, deadline=time.time() + 0.1)
+
+    llm.with_structured_output.return_value.invoke.assert_not_called() # The timed-out prompt was never sent
+    assert batcher.batches_sent == 0
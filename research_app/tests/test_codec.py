@@ -0,0 +1,72 @@
+import json
+import pytest
+
+# Use absolute imports from the research_app package
+from research_app.agents.schemas import ResearchResult, SummaryResult, RoutingDecision, TokenUsage
+from research_app.storage import codec
+from research_app.storage.codec import CodecError, MAGIC, CODEC_VERSION
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def state():
+    """A final graph state with every model-valued key filled in."""
+    return {
+        "query": "topic",
+        "deadline": 1700000000.5,
+        "research_info": ResearchResult(query="topic", search_results=["A.", "B."], raw_content="A.\n\n---\n\nB."),
+        "final_summary": SummaryResult(summary="Summary.", original_query="topic"),
+        "routing_decision": RoutingDecision(query="topic", tier="fast", model_name="fast-model", reason="small input"),
+        "token_usage": TokenUsage(input_tokens=120, output_tokens=30, calls=1),
+        "error_message": None,
+        "partial_result": False,
+        "timings": {"researcher": 0.5, "summarizer": 1.25},
+    }
+
+# --- Test Cases for codec ---
+
+# TDD Anchor: test_codec_round_trip
+def test_state_round_trip_restores_models(state):
+    data = codec.dumps_state(state)
+    assert data.startswith(MAGIC + bytes((CODEC_VERSION,)))
+
+    decoded = codec.loads_state(data)
+
+    assert decoded == state
+    assert isinstance(decoded["research_info"], ResearchResult)
+    assert decoded["token_usage"].total_tokens == 150
+
+def test_record_missing_a_required_field_raises():
+    data = codec.dumps({"query": "topic"}) # No search_results
+    with pytest.raises(ValueError, match="search_results"):
+        codec.loads_model(data, ResearchResult)
+
+def test_defaults_fill_missing_optional_fields():
+    decoded = codec.loads_model(codec.dumps({"query": "topic", "search_results": ["A."]}), ResearchResult)
+    assert (decoded.search_results, decoded.raw_content) == (["A."], "")
+
+def test_strict_flag_rejects_unknown_fields():
+    data = codec.dumps({"summary": "Summary.", "original_query": "topic", "model": "fast-model"})
+    assert codec.loads_model(data, SummaryResult) == SummaryResult(summary="Summary.", original_query="topic")
+    with pytest.raises(CodecError, match="model"):
+        codec.loads_model(data, SummaryResult, strict=True)
+
+def test_wrongly_typed_values_are_rejected():
+    data = codec.dumps({"query": "topic", "search_results": "not a list", "raw_content": ""})
+    with pytest.raises(ValueError):
+        codec.loads_model(data, ResearchResult)
+    state = codec.dumps({"query": "topic", "final_summary": {"summary": 5, "original_query": "topic"}})
+    with pytest.raises(ValueError):
+        codec.loads_state(state)
+
+def test_model_round_trip():
+    summary = SummaryResult(summary="Summary.", original_query="topic")
+    assert codec.loads_model(codec.dumps_model(summary), SummaryResult, strict=True) == summary
+
+def test_plain_json_from_before_the_codec_is_still_readable():
+    legacy = json.dumps({"query": "topic", "summary": "old"}).encode("utf-8")
+    assert codec.loads(legacy) == {"query": "topic", "summary": "old"}
+
+def test_newer_codec_version_is_rejected():
+    with pytest.raises(CodecError, match="version"):
+        codec.loads(MAGIC + bytes((CODEC_VERSION + 1,)) + b"{}")
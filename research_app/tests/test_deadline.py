@@ -0,0 +1,97 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.deadline import DeadlineExceeded, call_with_deadline, new_deadline, remaining
+from research_app.agents.researcher import ResearcherAgent
+from research_app.agents.summarizer import SummarizerAgent
+from research_app.agents.schemas import ResearchResult, SummaryResult
+from research_app.graph.builder import execute_research, execute_summary
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def settings():
+    """Provides real AppSettings with a single model (no routing)."""
+    return AppSettings(
+        google_api_key="fake_google_key",
+        brave_api_key="fake_brave_key",
+        google_llm_model_name="large-model",
+        google_llm_fast_model_name="large-model",
+    )
+
+@pytest.fixture
+def research_result():
+    return ResearchResult(query="test query", search_results=["Snippet 1.", "Snippet 2."],
+                          raw_content="Snippet 1.\n\n---\n\nSnippet 2.")
+
+# --- Test Cases for deadline helpers ---
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_llm_requests_end_within_query_timeout(mock_chat_google):
+    settings = AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key",
+                           google_llm_model_name="large-model", google_llm_fast_model_name="fast-model",
+                           query_timeout_seconds=30.0, llm_max_retries=2)
+    SummarizerAgent(settings)
+
+    assert mock_chat_google.call_count == 2 # Large and fast model
+    for call in mock_chat_google.call_args_list:
+        assert (call.kwargs["timeout"], call.kwargs["max_retries"]) == (10.0, 2)
+
+# TDD Anchor: test_call_with_deadline (from deadline.py)
+def test_new_deadline_disabled_for_zero_timeout():
+    assert new_deadline(0) is None
+    assert remaining(None) is None
+
+def test_call_with_deadline_returns_result():
+    assert call_with_deadline(lambda x: x * 2, new_deadline(5), "double", 21) == 42
+
+def test_call_with_deadline_reraises_errors():
+    def fail():
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError, match="boom"):
+        call_with_deadline(fail, new_deadline(5), "fail")
+
+def test_call_with_deadline_stops_waiting_at_deadline():
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(time.sleep, new_deadline(0.1), "sleep", 5)
+    assert time.monotonic() - started < 2
+
+# --- Test Cases for agents and nodes ---
+
+def test_researcher_raises_when_deadline_already_passed(settings):
+    agent = ResearcherAgent(settings=settings)
+    with patch('research_app.agents.researcher.requests.get') as mock_get:
+        with pytest.raises(DeadlineExceeded):
+            agent.run("query", deadline=time.time() - 1)
+        mock_get.assert_not_called()
+
+def test_research_node_flags_partial_on_deadline():
+    researcher = MagicMock()
+    researcher.run.side_effect = DeadlineExceeded("Deadline exceeded before research")
+    update = execute_research({"query": "q", "deadline": time.time()}, researcher=researcher)
+    assert update["partial_result"] is True
+    assert update["research_info"] is None
+    assert "Deadline exceeded" in update["error_message"]
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_summary_node_returns_snippets_when_llm_overruns(mock_chat_google, settings, research_result):
+    llm = MagicMock()
+    mock_chat_google.return_value = llm
+    llm.with_structured_output.return_value.invoke.side_effect = lambda prompt: time.sleep(5)
+    summarizer = SummarizerAgent(settings=settings)
+
+    state = {"query": "test query", "research_info": research_result, "deadline": new_deadline(0.1)}
+    update = execute_summary(state, summarizer=summarizer)
+
+    assert update["partial_result"] is True
+    assert update["error_message"] is None
+    summary = update["final_summary"]
+    assert isinstance(summary, SummaryResult)
+    assert summary.summary.startswith("[PARTIAL RESULT")
+    assert "Snippet 1." in summary.summary and "Snippet 2." in summary.summary
+    # The deadline must not trigger an escalation or a second LLM call
+    assert llm.with_structured_output.return_value.invoke.call_count == 1
@@ -0,0 +1,250 @@
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.jobs.store import JobQueue, DONE, DEAD, QUEUED
+from research_app.config import AppSettings
+from research_app.jobs.worker import run_job, worker_loop
+from research_app.agents.tokens import TokenBudget
+from research_app.agents.schemas import SummaryResult
+from research_app.storage.codec import loads_state
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def queue(tmp_path):
+    """Provides a fresh JobQueue backed by a temporary SQLite file."""
+    job_queue = JobQueue(str(tmp_path / "jobs.db"), visibility_timeout=60.0, max_attempts=2)
+    yield job_queue
+    job_queue.close()
+
+# --- Test Cases for JobQueue ---
+
+# TDD Anchor: test_job_queue (from store.py)
+def test_claim_orders_by_priority_then_submission(queue):
+    low = queue.submit("low", priority=0)
+    high = queue.submit("high", priority=5)
+    low_2 = queue.submit("low 2", priority=0)
+
+    claimed = queue.claim(batch_size=3)
+
+    assert [job.id for job in claimed] == [high, low, low_2]
+    assert all(job.attempts == 1 for job in claimed)
+
+def test_claimed_jobs_are_invisible_until_timeout(queue, monkeypatch):
+    job_id = queue.submit("query")
+    assert [job.id for job in queue.claim()] == [job_id]
+    assert queue.claim() == []
+
+    # Simulate a crashed worker: the visibility timeout expires and the job is re-delivered
+    import research_app.jobs.store as store
+    real_time = store.time.time
+    monkeypatch.setattr(store.time, "time", lambda: real_time() + 61.0)
+    redelivered = queue.claim()
+    assert [job.id for job in redelivered] == [job_id]
+    assert redelivered[0].attempts == 2
+
+def test_expired_job_out_of_attempts_is_dead_lettered(queue, monkeypatch):
+    job_id = queue.submit("query")
+    import research_app.jobs.store as store
+    real_time = store.time.time
+    for offset in (0.0, 61.0):
+        monkeypatch.setattr(store.time, "time", lambda offset=offset: real_time() + offset)
+        assert len(queue.claim()) == 1
+
+    monkeypatch.setattr(store.time, "time", lambda: real_time() + 200.0)
+    assert queue.claim() == []
+    assert queue.get(job_id).status == DEAD
+    assert [job.id for job in queue.dead_letters()] == [job_id]
+
+def test_ack_and_nack(queue):
+    done_id = queue.submit("done")
+    retry_id = queue.submit("retry")
+    leases = {job.id: job.lease for job in queue.claim(batch_size=2)}
+
+    assert queue.ack(done_id, leases[done_id], b"result") is True
+    assert queue.nack(retry_id, leases[retry_id], "transient error") is True
+
+    assert queue.get(done_id).status == DONE
+    assert queue.result(done_id) == b"result"
+    assert queue.get(retry_id).status == QUEUED
+    assert queue.get(retry_id).last_error == "transient error"
+
+    job = queue.claim()[0]
+    queue.nack(retry_id, job.lease, "still failing")
+    assert queue.get(retry_id).status == DEAD
+
+    queue.requeue(retry_id)
+    assert queue.get(retry_id).status == QUEUED
+    assert queue.get(retry_id).attempts == 0
+
+def test_release_requeues_without_using_an_attempt(queue):
+    job_id = queue.submit("query")
+    for _ in range(3): # More claims than max_attempts
+        job = queue.claim()[0]
+        assert job.attempts == 1
+        assert queue.release(job_id, job.lease, "batch budget exhausted") is True
+
+    assert queue.get(job_id).status == QUEUED
+    assert queue.get(job_id).attempts == 0
+    assert queue.get(job_id).last_error == "batch budget exhausted"
+    assert queue.release(job_id, job.lease, "stale") is False # Lease already given up
+
+def test_stale_lease_cannot_ack_or_nack_redelivered_job(queue, monkeypatch):
+    job_id = queue.submit("query")
+    stale = queue.claim()[0]
+
+    import research_app.jobs.store as store
+    real_time = store.time.time
+    monkeypatch.setattr(store.time, "time", lambda: real_time() + 61.0)
+    current = queue.claim()[0] # Re-delivered to a second worker
+
+    assert current.lease != stale.lease
+    assert queue.renew(job_id, stale.lease) is False
+    assert queue.nack(job_id, stale.lease, "late failure") is False
+    assert queue.ack(job_id, stale.lease, b"stale result") is False
+    assert queue.get(job_id).last_error is None
+
+    assert queue.ack(job_id, current.lease, b"result") is True
+    assert queue.result(job_id) == b"result"
+
+def test_batch_outliving_visibility_timeout(queue, monkeypatch):
+    first_id = queue.submit("first")
+    second_id = queue.submit("second")
+    first, second = queue.claim(batch_size=2)
+    graph = MagicMock()
+    graph.invoke.return_value = {
+        "query": "query",
+        "final_summary": SummaryResult(summary="done", original_query="query"),
+        "error_message": None,
+    }
+
+    import research_app.jobs.store as store
+    real_time = store.time.time
+    # The first job starts 50s into the batch: its visibility timeout restarts
+    monkeypatch.setattr(store.time, "time", lambda: real_time() + 50.0)
+    assert run_job(graph, queue, first) is True
+    # By 70s the second job, still waiting, has expired and goes to another worker
+    monkeypatch.setattr(store.time, "time", lambda: real_time() + 70.0)
+    assert [job.id for job in queue.claim(batch_size=2)] == [second_id]
+
+    assert run_job(graph, queue, second) is False # Skipped: lease lost
+    assert graph.invoke.call_count == 1
+    assert queue.get(first_id).status == DONE
+
+# --- Test Cases for run_job ---
+
+# TDD Anchor: test_run_job (from worker.py)
+def test_run_job_acks_successful_runs(queue):
+    queue.submit("query")
+    job = queue.claim()[0]
+    graph = MagicMock()
+    graph.invoke.return_value = {
+        "query": "query",
+        "final_summary": SummaryResult(summary="done", original_query="query"),
+        "error_message": None,
+    }
+
+    assert run_job(graph, queue, job) is True
+    assert queue.get(job.id).status == DONE
+    stored = loads_state(queue.result(job.id))
+    assert stored["final_summary"].summary == "done"
+
+def test_run_job_nacks_failures(queue):
+    queue.submit("query")
+    job = queue.claim()[0]
+    graph = MagicMock()
+    graph.invoke.return_value = {"query": "query", "error_message": "LLM unavailable"}
+
+    assert run_job(graph, queue, job) is False
+    assert queue.get(job.id).last_error == "LLM unavailable"
+
+def budget_exhausted_graph():
+    graph = MagicMock()
+    graph.invoke.return_value = {
+        "query": "query",
+        "final_summary": SummaryResult(summary="[PARTIAL RESULT: Token budget exhausted]", original_query="query"),
+        "error_message": None,
+        "partial_result": True,
+        "budget_exhausted": True,
+    }
+    return graph
+
+def test_run_job_requeues_jobs_cut_short_by_the_batch_budget(queue):
+    job_id = queue.submit("query")
+    graph = budget_exhausted_graph()
+    batch_budget = TokenBudget(1000)
+    for _ in range(3): # Budgets of earlier jobs keep running out; max_attempts is 2
+        batch_budget.reset()
+        batch_budget.commit(0, 300) # Spent by the jobs ahead of it; room for a call is left
+        job = queue.claim()[0]
+        assert run_job(graph, queue, job, batch_budget=batch_budget) is False
+
+    assert graph.invoke.call_count == 3
+    assert queue.get(job_id).status == QUEUED
+    assert queue.get(job_id).attempts == 0
+    assert "MAX_TOKENS_PER_BATCH" in queue.get(job_id).last_error
+
+def test_run_job_releases_jobs_without_running_once_the_batch_budget_is_spent(queue):
+    job_id = queue.submit("query")
+    job = queue.claim()[0]
+    graph = MagicMock()
+    batch_budget = TokenBudget(1000)
+    batch_budget.commit(0, 900) # No room left for a summary call
+
+    assert run_job(graph, queue, job, batch_budget=batch_budget) is False
+    graph.invoke.assert_not_called() # No research spent on a job that cannot be summarized
+    assert queue.get(job_id).status == QUEUED
+    assert queue.get(job_id).attempts == 0
+
+def test_run_job_nacks_jobs_that_exhaust_a_fresh_batch_budget(queue):
+    job_id = queue.submit("query", max_attempts=1)
+    job = queue.claim()[0]
+    assert run_job(budget_exhausted_graph(), queue, job, batch_budget=TokenBudget(1000)) is False
+
+    assert queue.get(job_id).status == DEAD
+    assert "alone exceeds" in queue.get(job_id).last_error
+
+def test_run_job_archives_results(queue, tmp_path):
+    from research_app.storage.archive import ResultsArchive
+    queue.submit("archived query")
+    job = queue.claim()[0]
+    graph = MagicMock()
+    graph.invoke.return_value = {
+        "query": "archived query",
+        "final_summary": SummaryResult(summary="done", original_query="archived query"),
+        "error_message": None,
+    }
+
+    with ResultsArchive(str(tmp_path / "archive")) as archive:
+        assert run_job(graph, queue, job, archive=archive) is True
+        assert archive.get("archived query")["summary"] == "done"
+
+# --- Test Cases for worker_loop ---
+
+def test_worker_loop_resets_the_batch_budget_for_each_claim(queue):
+    for i in range(4):
+        queue.submit(f"query {i}")
+    settings = AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key",
+                           max_tokens_per_batch=1000)
+    used_at_start = []
+
+    def build(app_settings, token_budget=None, model_router=None):
+        def invoke(initial_input):
+            used_at_start.append(token_budget.used)
+            token_budget.commit(0, 100) # Tokens spent by this job
+            return {
+                "query": initial_input["query"],
+                "final_summary": SummaryResult(summary="done", original_query=initial_input["query"]),
+                "error_message": None,
+            }
+        return MagicMock(invoke=invoke)
+
+    with patch('research_app.config.app_settings', settings), \
+            patch('research_app.graph.builder.build_graph', side_effect=build):
+        worker_loop(0, queue.path, batch_size=2, min_job_interval=0.0, visibility_timeout=60.0, max_attempts=2,
+                    poll_interval=0.01, exit_when_empty=True, stop_event=threading.Event())
+
+    assert used_at_start == [0, 100, 0, 100] # Each claimed batch of two starts with a fresh budget
+    assert queue.counts() == {DONE: 4}
@@ -0,0 +1,64 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.agents.batcher import SummaryBatcher
+from research_app.agents.schemas import SummaryResult, TokenUsage
+from research_app.main import run_batch
+from research_app.storage.archive import ResultsArchive
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def settings():
+    return AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key")
+
+class FakeGraph:
+    """Fake compiled graph: later queries finish first; records how many runs overlap."""
+
+    def __init__(self, queries):
+        self.queries = queries
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, initial_input):
+        query = initial_input["query"]
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05 * (len(self.queries) - self.queries.index(query)))
+        with self._lock:
+            self.in_flight -= 1
+        return {
+            "query": query,
+            "final_summary": SummaryResult(summary=f"summary of {query}", original_query=query),
+            "error_message": None,
+            "token_usage": TokenUsage(input_tokens=10, output_tokens=2, calls=1),
+        }
+
+# --- Test Cases for run_batch ---
+
+# TDD Anchor: test_main_execution (from main.py)
+def test_concurrent_batch_returns_and_archives_results_in_query_order(settings, tmp_path):
+    queries = [f"query {i}" for i in range(4)]
+    graph = FakeGraph(queries)
+
+    with patch('research_app.main.app_settings', settings), \
+            patch('research_app.main.build_research_graph', return_value=graph) as build:
+        summaries = run_batch(queries, archive_dir=str(tmp_path / "archive"), concurrency=4)
+
+    assert summaries == [f"summary of {query}" for query in queries]
+    assert graph.peak > 1 # The queries really ran concurrently
+    assert isinstance(build.call_args[0][2], SummaryBatcher) # Prompts of concurrent queries are batched
+    with ResultsArchive(str(tmp_path / "archive")) as archive:
+        assert [record["query"] for record in archive.scan()] == queries
+        assert archive.get("query 2")["summary"] == "summary of query 2"
+
+def test_batch_without_graph_returns_none_per_query(settings):
+    with patch('research_app.main.app_settings', settings), \
+            patch('research_app.main.build_research_graph', return_value=None):
+        assert run_batch(["a", "b"], concurrency=2) == [None, None]
@@ -0,0 +1,145 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.agents.researcher import ResearcherAgent
+from research_app.agents.schemas import SummaryResult
+from research_app.deadline import DeadlineExceeded
+from research_app.graph.builder import execute_pipeline
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def settings():
+    """Provides real AppSettings fetching three result pages."""
+    return AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key", research_pages=3)
+
+def make_researcher(batches, pages=None, delay_before_last=0.0):
+    """Mock researcher whose iter_result_batches yields the given (snippets, error) batches."""
+    researcher = MagicMock()
+    researcher.pages = pages or len(batches)
+
+    def iter_result_batches(query, deadline=None, idle_timeout=None):
+        for index, batch in enumerate(batches):
+            if index == len(batches) - 1 and delay_before_last:
+                # The last page lags behind: report idle periods like the real researcher
+                waited = 0.0
+                while waited < delay_before_last:
+                    step = min(delay_before_last - waited, idle_timeout or delay_before_last)
+                    time.sleep(step)
+                    waited += step
+                    if idle_timeout is not None and step >= idle_timeout:
+                        yield None
+            yield batch
+    researcher.iter_result_batches.side_effect = iter_result_batches
+    return researcher
+
+def make_summarizer():
+    summarizer = MagicMock()
+    summarizer.summarize_batch.side_effect = lambda query, batch, deadline=None, usage=None, query_budget=None: f"partial({','.join(batch)})"
+    summarizer.reduce.side_effect = lambda query, partials, deadline=None, snippets=None, usage=None, query_budget=None: SummaryResult(
+        summary=f"final[{';'.join(partials)}|{','.join(snippets or [])}]", original_query=query)
+    summarizer.last_routing_decision = None
+    return summarizer
+
+# --- Test Cases for ResearcherAgent.iter_result_batches ---
+
+# TDD Anchor: test_researcher_iter_result_batches (from researcher.py)
+def test_iter_result_batches_fetches_every_page(settings):
+    agent = ResearcherAgent(settings=settings)
+
+    def fake_get(url, headers, params, timeout):
+        if params["offset"] == 1:
+            raise requests.exceptions.ConnectionError("page 1 down")
+        response = MagicMock()
+        response.json.return_value = {"web": {"results": [{"description": f"snippet {params['offset']}"}]}}
+        return response
+
+    with patch('research_app.agents.researcher.requests.get', side_effect=fake_get):
+        batches = list(agent.iter_result_batches("query"))
+        result = agent.run("query")
+
+    assert len(batches) == 3
+    assert sorted(snippet for batch, _ in batches for snippet in batch) == ["snippet 0", "snippet 2"]
+    assert sum(1 for _, error in batches if error) == 1
+    assert sorted(result.search_results) == ["snippet 0", "snippet 2"]
+
+# --- Test Cases for execute_pipeline ---
+
+# TDD Anchor: test_pipeline_node (from builder.py)
+def test_pipeline_maps_lagging_batches_and_folds_last_batch_into_reduce():
+    researcher = make_researcher([(["a"], None), (["b"], None), (["c"], None)], delay_before_last=0.2)
+    summarizer = make_summarizer()
+
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=summarizer, map_skew_seconds=0.05)
+
+    assert update["error_message"] is None
+    assert update["research_info"].search_results == ["a", "b", "c"]
+    assert update["final_summary"].summary == "final[partial(a,b)|c]"
+    assert summarizer.summarize_batch.call_count == 1 # Early batches share one map call; the last is never mapped
+
+def test_pipeline_pages_landing_together_get_a_single_llm_call():
+    researcher = make_researcher([(["a"], None), (["b"], None), (["c"], None)])
+    summarizer = make_summarizer()
+
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=summarizer, map_skew_seconds=0.05)
+
+    assert update["final_summary"].summary == "final[|c,a,b]"
+    summarizer.summarize_batch.assert_not_called()
+
+def test_pipeline_waits_briefly_for_nearly_done_partial_summaries():
+    researcher = make_researcher([(["a"], None), (["b"], None)], delay_before_last=0.1)
+    summarizer = make_summarizer()
+    summarizer.summarize_batch.side_effect = lambda query, batch, deadline=None, usage=None, query_budget=None: time.sleep(0.2) or "partial(a)"
+
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=summarizer,
+                              map_skew_seconds=0.05, map_wait_seconds=2.0)
+
+    assert update["final_summary"].summary == "final[partial(a)|b]"
+
+def test_pipeline_does_not_wait_for_unfinished_partial_summaries():
+    release = threading.Event()
+    researcher = make_researcher([(["a"], None), (["b"], None)], delay_before_last=0.1)
+    summarizer = make_summarizer()
+    summarizer.summarize_batch.side_effect = lambda query, batch, deadline=None, usage=None, query_budget=None: release.wait(5) and "late"
+
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=summarizer,
+                              map_skew_seconds=0.05, map_wait_seconds=0.05)
+    release.set()
+
+    # The last batch is collected first, then the batch whose partial summary was still running
+    assert update["final_summary"].summary == "final[|b,a]"
+    # The abandoned map call keeps spending tokens: its prompt is reported as an estimate
+    assert (update["token_usage"].calls, update["token_usage"].estimated) == (1, True)
+
+def test_pipeline_failed_partial_summary_falls_back_to_raw_snippets():
+    researcher = make_researcher([(["a"], None), (["b"], None)], delay_before_last=0.2)
+    summarizer = make_summarizer()
+    summarizer.summarize_batch.side_effect = RuntimeError("LLM unavailable")
+
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=summarizer, map_skew_seconds=0.05)
+
+    assert update["error_message"] is None
+    assert update["final_summary"].summary == "final[|b,a]"
+
+def test_pipeline_research_errors_on_every_page():
+    researcher = make_researcher([([], "Error during Brave Search API request: down")] * 2)
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=make_summarizer())
+    assert update["error_message"].startswith("Research failed internally: Error during")
+
+def test_pipeline_deadline_during_reduce_returns_partial_result():
+    researcher = make_researcher([(["a"], None), (["b"], None)], delay_before_last=0.2)
+    summarizer = make_summarizer()
+    summarizer.reduce.side_effect = DeadlineExceeded("Deadline exceeded during LLM call")
+
+    update = execute_pipeline({"query": "q"}, researcher=researcher, summarizer=summarizer, map_skew_seconds=0.05)
+
+    assert update["partial_result"] is True
+    summary = update["final_summary"].summary
+    assert summary.startswith("[PARTIAL RESULT")
+    assert "partial(a)" in summary and "- b" in summary
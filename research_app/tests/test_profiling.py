@@ -0,0 +1,92 @@
+import pstats
+
+# Use absolute imports from the research_app package
+from research_app.profiling import NodeProfiler
+from research_app.deadline import call_with_deadline, new_deadline
+
+# --- Test Helpers ---
+
+def busy_node(state):
+    """A node that burns some CPU and keeps an allocation alive in the returned update."""
+    total = sum(i * i for i in range(20000))
+    return {"payload": [str(i) for i in range(5000)], "total": total}
+
+def idle_node(state):
+    return {}
+
+def expensive_fn():
+    return sum(i * i for i in range(200000))
+
+def deadline_node(state):
+    """Like the summarizer: the heavy work runs in call_with_deadline's helper thread."""
+    return {"total": call_with_deadline(expensive_fn, new_deadline(30), "expensive call")}
+
+# --- Test Cases ---
+
+# TDD Anchor: test_node_profiler (from profiling.py)
+def test_wrapped_node_returns_original_result():
+    profiler = NodeProfiler()
+    wrapped = profiler.wrap("researcher", busy_node)
+    assert wrapped({})["total"] == busy_node({})["total"]
+
+def test_time_and_allocations_are_attributed_per_node():
+    profiler = NodeProfiler(top_n=5)
+    profiler.start()
+    try:
+        busy, idle = profiler.wrap("researcher", busy_node), profiler.wrap("summarizer", idle_node)
+        kept = busy({})
+        idle({})
+    finally:
+        profiler.stop()
+
+    summary = profiler.summary()
+    assert "researcher" in summary and "summarizer" in summary
+    report = profiler.allocation_report()
+    researcher_section = report.split("=== summarizer")[0]
+    assert "test_profiling.py" in researcher_section # busy_node's list comprehension
+    assert kept["payload"]
+
+def test_write_reports(tmp_path):
+    profiler = NodeProfiler()
+    profiler.start()
+    try:
+        profiler.wrap("researcher", busy_node)({})
+    finally:
+        profiler.stop()
+
+    written = profiler.write_reports(str(tmp_path))
+
+    names = {path.rsplit("/", 1)[-1] for path in written}
+    assert names == {"researcher.prof", "profile.collapsed", "allocations.txt", "summary.txt"}
+    assert pstats.Stats(str(tmp_path / "researcher.prof")).total_calls > 0
+    collapsed = (tmp_path / "profile.collapsed").read_text().splitlines()
+    assert collapsed
+    for line in collapsed:
+        stack, value = line.rsplit(" ", 1)
+        assert stack.startswith("researcher;")
+        assert int(value) > 0
+
+def test_work_in_deadline_threads_is_profiled_under_the_node(tmp_path):
+    profiler = NodeProfiler()
+    profiler.start()
+    try:
+        profiler.wrap("summarizer", deadline_node)({})
+    finally:
+        profiler.stop()
+    profiler.write_reports(str(tmp_path))
+
+    stats = pstats.Stats(str(tmp_path / "summarizer.prof"))
+    profiled = {name for _, _, name in stats.stats}
+    assert "expensive_fn" in profiled
+    assert "expensive_fn" in (tmp_path / "profile.collapsed").read_text()
+
+def test_helper_threads_are_only_wrapped_while_a_profiler_runs():
+    from research_app.thread_hooks import carry_context
+    profiler = NodeProfiler()
+    assert carry_context(expensive_fn) is expensive_fn
+    profiler.start()
+    try:
+        assert profiler.wrap("summarizer", lambda state: carry_context(expensive_fn))({}) is not expensive_fn
+    finally:
+        profiler.stop()
+    assert carry_context(expensive_fn) is expensive_fn
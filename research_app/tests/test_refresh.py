@@ -0,0 +1,195 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.agents.researcher import ResearcherAgent, snippet_fingerprint
+from research_app.agents.summarizer import SummarizerAgent
+from research_app.agents.schemas import ResearchResult, SummaryResult
+from research_app.deadline import DeadlineExceeded
+from research_app.graph.builder import execute_summary, REFRESH_UNCHANGED, REFRESH_UPDATED
+from research_app.storage.archive import ResultsArchive, record_from_state
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def previous_state():
+    """Refresh inputs as built from an archived record."""
+    return {
+        "query": "topic",
+        "previous_research": ResearchResult(query="topic", search_results=["Old fact A.", "Old fact B."]),
+        "previous_summary": SummaryResult(summary="Previous summary.", original_query="topic"),
+    }
+
+def research(*snippets):
+    return ResearchResult(query="topic", search_results=list(snippets), raw_content="\n\n---\n\n".join(snippets))
+
+# --- Test Cases for snippet fingerprints ---
+
+# TDD Anchor: test_researcher_new_snippets (from researcher.py)
+def test_new_snippets_ignore_whitespace_and_case_changes():
+    assert snippet_fingerprint("Old  fact\nA.") == snippet_fingerprint("old fact a.")
+    seen = [snippet_fingerprint("Old fact A."), snippet_fingerprint("Old fact B.")]
+    current = research("old  FACT a.", "New fact C.", "New fact C.")
+    assert ResearcherAgent.new_snippets(seen, current) == ["New fact C."]
+
+# --- Test Cases for refresh in execute_summary ---
+
+# TDD Anchor: test_summarize_node (from builder.py)
+def test_refresh_without_new_snippets_skips_llm(previous_state):
+    summarizer = MagicMock()
+    update = execute_summary({**previous_state, "research_info": research("Old fact B.", "Old fact A.")},
+                             summarizer=summarizer)
+
+    assert update["refresh_status"] == REFRESH_UNCHANGED
+    assert update["final_summary"].summary == "Previous summary."
+    assert update["token_usage"].calls == 0
+    summarizer.run.assert_not_called()
+    summarizer.refresh.assert_not_called()
+
+def test_refresh_summarizes_only_new_snippets(previous_state):
+    summarizer = MagicMock()
+    summarizer.refresh.return_value = SummaryResult(summary="Updated summary.", original_query="topic")
+
+    update = execute_summary({**previous_state, "research_info": research("Old fact A.", "New fact C.")},
+                             summarizer=summarizer)
+
+    assert update["refresh_status"] == REFRESH_UPDATED
+    assert update["final_summary"].summary == "Updated summary."
+    previous_summary, delta = summarizer.refresh.call_args[0]
+    assert previous_summary.summary == "Previous summary."
+    assert delta.search_results == ["New fact C."]
+    summarizer.run.assert_not_called()
+
+def test_refresh_deadline_returns_previous_summary_and_new_snippets(previous_state):
+    summarizer = MagicMock()
+    summarizer.refresh.side_effect = DeadlineExceeded("Deadline exceeded during LLM call")
+
+    update = execute_summary({**previous_state, "research_info": research("New fact C.")}, summarizer=summarizer)
+
+    assert update["partial_result"] is True
+    assert "- Previous summary." in update["final_summary"].summary
+    assert "- New fact C." in update["final_summary"].summary
+
+def test_snippets_summarized_by_any_earlier_run_are_not_new(previous_state):
+    summarizer = MagicMock()
+    # "Old fact A." dropped out of the last run's results, but an earlier summary covered it
+    state = {**previous_state, "previous_fingerprints": [snippet_fingerprint("Old fact A."),
+                                                         snippet_fingerprint("Old fact B.")],
+             "previous_research": ResearchResult(query="topic", search_results=["Old fact B."]),
+             "research_info": research("Old fact A.")}
+
+    update = execute_summary(state, summarizer=summarizer)
+
+    assert update["refresh_status"] == REFRESH_UNCHANGED
+    summarizer.refresh.assert_not_called()
+
+def test_fingerprints_are_carried_through_runs_without_results(previous_state, tmp_path):
+    from research_app.main import refresh_input
+    summarizer = MagicMock()
+    summarizer.refresh.return_value = SummaryResult(summary="Updated summary.", original_query="topic")
+    with ResultsArchive(str(tmp_path / "archive")) as archive:
+        archive.append(record_from_state({
+            "query": "topic",
+            "research_info": research("Old fact A.", "Old fact B."),
+            "final_summary": SummaryResult(summary="Previous summary.", original_query="topic"),
+        }))
+
+        # Brave returns nothing: unchanged, and the record keeps covering A and B
+        empty = ResearchResult(query="topic", search_results=[], raw_content="")
+        state = {"query": "topic", "research_info": empty, **refresh_input(archive, "topic")}
+        archive.append(record_from_state({**state, **execute_summary(state, summarizer=summarizer)}))
+
+        # Next run: A and B are back alongside a new snippet; only the new one is summarized
+        state = {"query": "topic", "research_info": research("Old fact A.", "Old fact B.", "New fact C."),
+                 **refresh_input(archive, "topic")}
+        update = execute_summary(state, summarizer=summarizer)
+        archive.append(record_from_state({**state, **update}))
+        covered = refresh_input(archive, "topic")["previous_fingerprints"]
+
+    assert update["refresh_status"] == REFRESH_UPDATED
+    assert summarizer.refresh.call_args[0][1].search_results == ["New fact C."]
+    assert set(covered) == {snippet_fingerprint(s) for s in ("Old fact A.", "Old fact B.", "New fact C.")}
+
+# --- Test Cases for SummarizerAgent.refresh ---
+
+# TDD Anchor: test_summarizer_refresh (from summarizer.py)
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_summarizer_refresh_prompt_contains_previous_summary_and_new_snippets_only(mock_chat_google, previous_state):
+    llm = MagicMock()
+    mock_chat_google.return_value = llm
+    llm.with_structured_output.return_value.invoke.return_value = SummaryResult(summary="Updated.", original_query="")
+    settings = AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key",
+                           google_llm_model_name="model", google_llm_fast_model_name="model")
+
+    result = SummarizerAgent(settings).refresh(previous_state["previous_summary"], research("New fact C."))
+
+    prompt = llm.with_structured_output.return_value.invoke.call_args[0][0]
+    assert "Previous summary." in prompt and "New fact C." in prompt and "Old fact" not in prompt
+    assert (result.summary, result.original_query) == ("Updated.", "topic")
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_budget_starved_refresh_does_not_report_the_previous_querys_routing(mock_chat_google):
+    llm = MagicMock()
+    mock_chat_google.return_value = llm
+    llm.with_structured_output.return_value.invoke.return_value = SummaryResult(summary="Summary A.", original_query="")
+    settings = AppSettings(google_api_key="fake_google_key", brave_api_key="fake_brave_key",
+                           google_llm_model_name="model", google_llm_fast_model_name="model",
+                           max_tokens_per_query=700)
+    agent = SummarizerAgent(settings)
+    agent.run(ResearchResult(query="query A", search_results=["Fact A."], raw_content="Fact A."))
+    assert agent.last_routing_decision.query == "query A"
+
+    # Same agent and thread: the new snippet alone does not fit MAX_TOKENS_PER_QUERY
+    state = {
+        "query": "query B",
+        "previous_research": ResearchResult(query="query B", search_results=["Old fact."]),
+        "previous_summary": SummaryResult(summary="Previous summary.", original_query="query B"),
+        "research_info": ResearchResult(query="query B", search_results=["Old fact.", "New fact. " * 400]),
+    }
+    update = execute_summary(state, summarizer=agent)
+
+    assert update["partial_result"] is True
+    assert update["routing_decision"] is None
+    assert record_from_state({**state, **update})["routing_decision"] is None
+
+# --- Test Cases for refresh inputs from the archive ---
+
+def test_refresh_input_uses_latest_complete_archived_result(tmp_path):
+    from research_app.main import refresh_input
+    with ResultsArchive(str(tmp_path / "archive")) as archive:
+        assert refresh_input(archive, "topic") == {"refresh_status": "new"}
+
+        archive.append(record_from_state({
+            "query": "topic",
+            "research_info": research("Old fact A."),
+            "final_summary": SummaryResult(summary="Previous summary.", original_query="topic"),
+        }))
+        refresh = refresh_input(archive, "Topic")
+
+    assert refresh["previous_research"].search_results == ["Old fact A."]
+    assert refresh["previous_summary"].summary == "Previous summary."
+
+def test_refresh_input_skips_newer_incomplete_records(tmp_path):
+    from research_app.main import refresh_input
+    with ResultsArchive(str(tmp_path / "archive")) as archive:
+        archive.append(record_from_state({
+            "query": "topic",
+            "research_info": research("Old fact A.", "Old fact B."),
+            "final_summary": SummaryResult(summary="Previous summary.", original_query="topic"),
+            "snippet_fingerprints": [snippet_fingerprint(s) for s in ("Old fact A.", "Old fact B.", "Old fact C.")],
+        }))
+        # The next daily runs fail: a Brave error, then a partial result cut off by the deadline
+        archive.append(record_from_state({"query": "topic", "error_message": "Brave API error"}))
+        archive.append(record_from_state({
+            "query": "topic",
+            "research_info": research("Old fact A."),
+            "final_summary": SummaryResult(summary="Partial summary.", original_query="topic"),
+            "partial_result": True,
+        }))
+        refresh = refresh_input(archive, "topic")
+
+    assert "refresh_status" not in refresh
+    assert refresh["previous_summary"].summary == "Previous summary."
+    assert refresh["previous_research"].search_results == ["Old fact A.", "Old fact B."]
+    assert set(refresh["previous_fingerprints"]) == {snippet_fingerprint(s) for s in ("Old fact A.", "Old fact B.", "Old fact C.")}
@@ -0,0 +1,133 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.agents.router import ModelRouter, FAST_TIER, LARGE_TIER, format_latency_summary, _percentile
+from research_app.agents.summarizer import SummarizerAgent
+from research_app.agents.schemas import ResearchResult, SummaryResult
+
+# --- Test Fixtures ---
+
+@pytest.fixture
+def settings():
+    """Provides real AppSettings with small routing thresholds."""
+    return AppSettings(
+        google_api_key="fake_google_key",
+        brave_api_key="fake_brave_key",
+        google_llm_model_name="large-model",
+        google_llm_fast_model_name="fast-model",
+        routing_fast_max_chars=100,
+        routing_fast_max_snippets=2,
+        routing_fast_max_query_words=5,
+    )
+
+@pytest.fixture
+def small_research():
+    """Provides a ResearchResult small enough for the fast model."""
+    return ResearchResult(query="short query", search_results=["A.", "B."], raw_content="A.\n\n---\n\nB.")
+
+@pytest.fixture
+def long_research():
+    """Provides a ResearchResult whose content exceeds the fast model threshold."""
+    return ResearchResult(query="short query", search_results=["A."], raw_content="x" * 500)
+
+# --- Test Cases for ModelRouter ---
+
+# TDD Anchor: test_router_choose (from router.py)
+def test_router_routes_small_input_to_fast_model(settings, small_research):
+    decision = ModelRouter(settings).choose(small_research)
+    assert decision.tier == FAST_TIER
+    assert decision.model_name == "fast-model"
+
+def test_router_routes_long_content_to_large_model(settings, long_research):
+    decision = ModelRouter(settings).choose(long_research)
+    assert decision.tier == LARGE_TIER
+    assert decision.model_name == "large-model"
+    assert "content length" in decision.reason
+
+def test_router_routes_many_snippets_and_long_queries_to_large_model(settings):
+    router = ModelRouter(settings)
+    many = ResearchResult(query="q", search_results=["a", "b", "c"], raw_content="a b c")
+    wordy = ResearchResult(query="one two three four five six", search_results=["a"], raw_content="a")
+    assert router.choose(many).tier == LARGE_TIER
+    assert router.choose(wordy).tier == LARGE_TIER
+
+def test_router_without_distinct_fast_model_uses_large(settings, small_research):
+    settings.google_llm_fast_model_name = settings.google_llm_model_name
+    assert ModelRouter(settings).choose(small_research).tier == LARGE_TIER
+
+def test_router_latency_summary(settings, small_research):
+    router = ModelRouter(settings)
+    for latency in (0.5, 0.1, 0.4, 0.2, 0.3):
+        decision = router.choose(small_research)
+        decision.latency_seconds = latency
+        router.record(decision)
+    summary = router.latency_summary()
+    assert summary[FAST_TIER]["count"] == 5
+    assert summary[FAST_TIER]["p50_seconds"] == pytest.approx(0.3) # Nearest rank: 3rd of 5
+    assert summary[FAST_TIER]["p95_seconds"] == pytest.approx(0.5)
+    assert format_latency_summary(summary) == ["fast: 5 LLM call(s), 0 escalated, p50 0.30s, p95 0.50s"]
+
+def test_percentiles_use_nearest_rank():
+    values = [float(i) for i in range(1, 31)]
+    assert _percentile(values, 0.95) == 29.0 # ceil(0.95 * 30) = 29th value
+    assert _percentile(values, 0.50) == 15.0
+    assert _percentile([1.0, 2.0, 3.0, 4.0, 5.0], 0.50) == 3.0
+    assert _percentile([], 0.95) == 0.0
+
+def test_router_latency_summary_while_other_threads_record(settings, small_research):
+    import threading
+    router = ModelRouter(settings, history_size=50)
+    decision = router.choose(small_research)
+    stop = threading.Event()
+
+    def record_until_stopped():
+        while not stop.is_set():
+            router.record(decision)
+
+    with patch("builtins.print"):
+        recorder = threading.Thread(target=record_until_stopped)
+        recorder.start()
+        try:
+            for _ in range(200):
+                router.latency_summary() # Must not see the deque mutate mid-iteration
+        finally:
+            stop.set()
+            recorder.join()
+    assert router.latency_summary()[FAST_TIER]["count"] == 50
+
+# --- Test Cases for routing inside SummarizerAgent ---
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_summarizer_uses_fast_model_for_small_input(mock_chat_google, settings, small_research):
+    large_llm, fast_llm = MagicMock(), MagicMock()
+    mock_chat_google.side_effect = [large_llm, fast_llm]
+    fast_llm.with_structured_output.return_value.invoke.return_value = SummaryResult(
+        summary="fast summary", original_query=small_research.query)
+
+    agent = SummarizerAgent(settings=settings)
+    result = agent.run(small_research)
+
+    assert result.summary == "fast summary"
+    large_llm.with_structured_output.assert_not_called()
+    assert agent.last_routing_decision.tier == FAST_TIER
+    assert agent.last_routing_decision.escalated is False
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_summarizer_escalates_when_fast_model_output_is_invalid(mock_chat_google, settings, small_research):
+    large_llm, fast_llm = MagicMock(), MagicMock()
+    mock_chat_google.side_effect = [large_llm, fast_llm]
+    fast_llm.with_structured_output.return_value.invoke.return_value = None # Failed validation
+    large_llm.with_structured_output.return_value.invoke.return_value = SummaryResult(
+        summary="large summary", original_query=small_research.query)
+
+    agent = SummarizerAgent(settings=settings)
+    result = agent.run(small_research)
+
+    assert result.summary == "large summary"
+    decision = agent.last_routing_decision
+    assert decision.tier == LARGE_TIER
+    assert decision.escalated is True
+    assert decision.latency_seconds >= 0.0
+    assert list(agent.router.decisions) == [decision]
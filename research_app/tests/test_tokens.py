@@ -0,0 +1,172 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Use absolute imports from the research_app package
+from research_app.config import AppSettings
+from research_app.agents.summarizer import SummarizerAgent
+from research_app.agents.schemas import ResearchResult, SummaryResult, TokenUsage
+from research_app.agents.router import FAST_TIER
+from research_app.agents.tokens import (BatchBudgetExceeded, TokenBudget, TokenBudgetExceeded, estimate_tokens,
+                                        usage_from_response, SUMMARY_OUTPUT_TOKENS_ESTIMATE)
+from research_app.graph.builder import execute_summary
+
+# --- Test Fixtures ---
+
+def make_settings(**overrides):
+    """Real AppSettings with a distinct fast model and the given budget overrides."""
+    return AppSettings(
+        google_api_key="fake_google_key",
+        brave_api_key="fake_brave_key",
+        google_llm_model_name="large-model",
+        google_llm_fast_model_name="fast-model",
+        **overrides,
+    )
+
+def raw_response(summary, input_tokens=None, output_tokens=None):
+    """Mimics `with_structured_output(..., include_raw=True).invoke` output."""
+    raw = MagicMock()
+    raw.usage_metadata = (
+        {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        if input_tokens is not None else None
+    )
+    parsed = SummaryResult(summary=summary, original_query="q")
+    return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+@pytest.fixture
+def research():
+    """Ten snippets of roughly 100 tokens each."""
+    snippets = [f"snippet {i} " + "x" * 400 for i in range(10)]
+    return ResearchResult(query="q", search_results=snippets, raw_content="\n\n---\n\n".join(snippets))
+
+def make_agent(mock_chat_google, settings):
+    large_llm, fast_llm = MagicMock(), MagicMock()
+    mock_chat_google.side_effect = [large_llm, fast_llm]
+    agent = SummarizerAgent(settings=settings)
+    return agent, large_llm, fast_llm
+
+# --- Test Cases for token helpers ---
+
+# TDD Anchor: test_token_budget (from tokens.py)
+def test_usage_from_response_prefers_metadata_and_falls_back_to_estimate():
+    measured = usage_from_response(MagicMock(usage_metadata={"input_tokens": 12, "output_tokens": 3}), "p", "s")
+    assert (measured.input_tokens, measured.output_tokens, measured.estimated) == (12, 3, False)
+
+    estimated = usage_from_response(None, "x" * 400, "y" * 40)
+    assert (estimated.input_tokens, estimated.output_tokens) == (estimate_tokens("x" * 400), estimate_tokens("y" * 40))
+    assert estimated.estimated is True
+
+def test_token_budget_reserve_and_commit():
+    assert TokenBudget(0).reserve(10**9) is True # Unlimited
+    budget = TokenBudget(100)
+    assert budget.reserve(80) is True
+    assert budget.reserve(30) is False # Would exceed the limit together with the open reservation
+    budget.commit(80, 50)
+    assert budget.used == 50
+    assert budget.remaining() == 50
+
+    budget.reset() # Next batch
+    assert (budget.used, budget.remaining()) == (0, 100)
+
+# TDD Anchor: test_token_usage_schema (from schemas.py)
+def test_token_usage_add():
+    usage = TokenUsage(input_tokens=10, output_tokens=2, calls=1)
+    usage.add(TokenUsage(input_tokens=5, output_tokens=1, calls=1, estimated=True))
+    assert (usage.total_tokens, usage.calls, usage.estimated) == (18, 2, True)
+
+# --- Test Cases for token accounting in SummarizerAgent ---
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_run_records_usage_metadata(mock_chat_google, research):
+    agent, large_llm, _ = make_agent(mock_chat_google, make_settings())
+    large_llm.with_structured_output.return_value.invoke.return_value = raw_response("summary", 1200, 80)
+    usage = TokenUsage()
+
+    result = agent.run(research, usage=usage)
+
+    assert result.summary == "summary"
+    large_llm.with_structured_output.assert_called_once_with(SummaryResult, include_raw=True)
+    assert (usage.input_tokens, usage.output_tokens, usage.calls, usage.estimated) == (1200, 80, 1, False)
+    assert agent.batch_budget.used == 1280
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_query_budget_truncates_content_and_routes_to_fast_model(mock_chat_google, research):
+    agent, large_llm, fast_llm = make_agent(mock_chat_google, make_settings(max_tokens_per_query=900))
+    fast_llm.with_structured_output.return_value.invoke.return_value = raw_response("short summary")
+    usage = TokenUsage()
+
+    agent.run(research, usage=usage)
+
+    prompt = fast_llm.with_structured_output.return_value.invoke.call_args[0][0]
+    assert estimate_tokens(prompt) + SUMMARY_OUTPUT_TOKENS_ESTIMATE <= 900
+    assert "snippet 0" in prompt and "snippet 9" not in prompt
+    large_llm.with_structured_output.assert_not_called()
+    assert agent.last_routing_decision.tier == FAST_TIER
+    assert "token budget" in agent.last_routing_decision.reason
+    assert usage.truncated is True and usage.estimated is True
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_exhausted_batch_budget_skips_llm_and_returns_partial_result(mock_chat_google, research):
+    agent, large_llm, _ = make_agent(mock_chat_google, make_settings(max_tokens_per_batch=5000))
+    large_llm.with_structured_output.return_value.invoke.return_value = raw_response("summary", 4800, 100)
+
+    first = execute_summary({"research_info": research}, summarizer=agent)
+    assert first["final_summary"].summary == "summary"
+    assert first["token_usage"].total_tokens == 4900
+
+    with pytest.raises(TokenBudgetExceeded):
+        agent.run(research)
+    second = execute_summary({"research_info": research}, summarizer=agent)
+
+    assert second["partial_result"] is True
+    assert second["budget_exhausted"] is True # A later batch can retry the query
+    assert second["final_summary"].summary.startswith("[PARTIAL RESULT: Token budget exhausted")
+    assert second["token_usage"].calls == 0
+    assert large_llm.with_structured_output.return_value.invoke.call_count == 1
+
+@pytest.mark.parametrize("budget_setting, error_type", [
+    ("max_tokens_per_query", TokenBudgetExceeded),
+    ("max_tokens_per_batch", BatchBudgetExceeded),
+])
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_escalation_after_fast_model_failure_must_fit_the_budget(mock_chat_google, budget_setting, error_type):
+    small = ResearchResult(query="q", search_results=["a short snippet"], raw_content="a short snippet")
+    prompt_tokens = estimate_tokens(SummarizerAgent._summary_prompt(small))
+    # Room for the fast call, but not for a second call after the failed one consumed its prompt
+    limit = prompt_tokens + SUMMARY_OUTPUT_TOKENS_ESTIMATE + prompt_tokens // 2
+    agent, large_llm, fast_llm = make_agent(mock_chat_google, make_settings(**{budget_setting: limit}))
+    fast_llm.with_structured_output.return_value.invoke.side_effect = ValueError("invalid output")
+    usage = TokenUsage()
+
+    with pytest.raises(error_type):
+        agent.run(small, usage=usage)
+
+    large_llm.with_structured_output.return_value.invoke.assert_not_called()
+    assert usage.calls == 1
+    assert agent.batch_budget.used == usage.total_tokens == prompt_tokens
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_overlapping_calls_of_one_query_reserve_from_its_budget(mock_chat_google):
+    agent, large_llm, _ = make_agent(mock_chat_google, make_settings(max_tokens_per_query=2000))
+    query_budget = agent.new_query_budget()
+    assert query_budget.reserve(1800) is True # A map call of the same query still in flight
+
+    with pytest.raises(TokenBudgetExceeded):
+        agent.summarize_batch("q", ["a short snippet"], query_budget=query_budget)
+
+    large_llm.with_structured_output.return_value.invoke.assert_not_called()
+    assert agent.batch_budget.remaining() is None and query_budget.used == 0
+
+@patch('research_app.agents.summarizer.ChatGoogleGenerativeAI')
+def test_call_abandoned_at_the_deadline_is_charged_its_prompt(mock_chat_google, research):
+    import time
+    from research_app.deadline import DeadlineExceeded, new_deadline
+    agent, large_llm, _ = make_agent(mock_chat_google, make_settings(max_tokens_per_batch=10**6))
+    large_llm.with_structured_output.return_value.invoke.side_effect = lambda prompt: time.sleep(0.5)
+    usage = TokenUsage()
+
+    with pytest.raises(DeadlineExceeded):
+        agent.run(research, deadline=new_deadline(0.05), usage=usage)
+
+    prompt_tokens = estimate_tokens(SummarizerAgent._summary_prompt(research))
+    assert (usage.input_tokens, usage.calls, usage.estimated) == (prompt_tokens, 1, True)
+    assert agent.batch_budget.used == prompt_tokens # The request keeps running after it was abandoned
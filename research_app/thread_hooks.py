@@ -0,0 +1,22 @@
+from typing import Any, Callable, Optional
+
+# Installed by an active NodeProfiler; None (the default) keeps carry_context a no-op
+_target_hook: Optional[Callable[[Callable[..., Any]], Callable[..., Any]]] = None
+
+
+def carry_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Returns `fn` prepared to run in a helper thread on behalf of the calling thread.
+
+    Code that hands work to helper threads (deadline calls, search pages, pipeline map calls)
+    wraps the thread's target with this. Unless a hook is installed (the profiler does so
+    while it runs, see `NodeProfiler.start`), `fn` is returned unchanged.
+    """
+    hook = _target_hook
+    return fn if hook is None else hook(fn)
+
+
+def set_target_hook(hook: Optional[Callable[[Callable[..., Any]], Callable[..., Any]]]) -> None:
+    """Installs (or, with None, removes) the hook `carry_context` applies to helper-thread targets."""
+    global _target_hook
+    _target_hook = hook